@@ -0,0 +1,86 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import charge, micro
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ==========================
+# POINT D'ENTRÉE : python -m benchmarks
+# ==========================
+def commit_courant():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RACINE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def aplatir(d, prefixe=""):
+    for cle, valeur in d.items():
+        nom = f"{prefixe}{cle}"
+        if isinstance(valeur, dict):
+            yield from aplatir(valeur, nom + ".")
+        else:
+            yield nom, valeur
+
+
+def comparer(actuel, precedent, seuil):
+    # Métriques de latence (p50/p99) et d'appels : plus haut = moins bien
+    regressions = []
+    anciennes = dict(aplatir(precedent))
+    for nom, valeur in aplatir(actuel):
+        if not nom.endswith(("p50_ms", "p99_ms", "appels_par_rerun")) or not anciennes.get(nom):
+            continue
+        ecart = (valeur - anciennes[nom]) / anciennes[nom]
+        if ecart > seuil:
+            regressions.append((nom, anciennes[nom], valeur, ecart))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks et test de charge de streamlit_app.py")
+    parser.add_argument("--joueurs", type=int, default=10, help="sessions joueur simulées")
+    parser.add_argument("--admins", type=int, default=1, help="sessions admin simulées")
+    parser.add_argument("--ticks", type=int, default=5, help="ticks d'autorefresh par session")
+    parser.add_argument("--latence", type=float, default=0.0, help="latence par appel backend (s)")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--sans-charge", action="store_true", help="micro-benchmarks uniquement")
+    parser.add_argument("--sortie", default=os.path.join(RACINE, ".benchmarks"))
+    parser.add_argument("--seuil", type=float, default=0.2, help="écart relatif signalé comme régression")
+    parser.add_argument("--strict", action="store_true", help="code de sortie 1 en cas de régression")
+    args = parser.parse_args(argv)
+
+    resultats = {"commit": commit_courant(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "micro": micro.executer(args.repetitions)}
+    if not args.sans_charge:
+        resultats["charge"] = charge.executer(args.joueurs, args.admins, args.ticks, args.latence)
+
+    os.makedirs(args.sortie, exist_ok=True)
+    precedents = sorted(glob.glob(os.path.join(args.sortie, "*.json")), key=os.path.getmtime)
+    precedents = [p for p in precedents if os.path.basename(p) != f"{resultats['commit']}.json"]
+    chemin = os.path.join(args.sortie, f"{resultats['commit']}.json")
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+
+    print(json.dumps(resultats, indent=2, ensure_ascii=False))
+    print(f"\nRésultats enregistrés dans {chemin}")
+
+    if precedents:
+        with open(precedents[-1], encoding="utf-8") as f:
+            precedent = json.load(f)
+        regressions = comparer(resultats, precedent, args.seuil)
+        print(f"Comparaison avec {precedent['commit']} : {len(regressions)} régression(s)")
+        for nom, avant, apres, ecart in regressions:
+            print(f"  {nom} : {avant} -> {apres} (+{ecart:.0%})")
+        if regressions and args.strict:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
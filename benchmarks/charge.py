@@ -0,0 +1,71 @@
+import os
+import time
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.faux_supabase import FauxSupabase, peupler
+from benchmarks.mesures import resumer, rss_max_mo
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+
+# ==========================
+# TEST DE CHARGE (AppTest)
+# ==========================
+# Chaque session AppTest joue un onglet ouvert : un run() par tick d'autorefresh.
+# Les sessions admin alternent un rerun simple et un tirage de 5 plantes.
+# Les sessions s'exécutent l'une après l'autre : AppTest passe par un session_state global au
+# processus et ne supporte pas plusieurs run() simultanés. Les mesures sont donc séquentielles
+# (débit et latence d'un rerun sans contention entre sessions) ; les caches partagés et le
+# nombre d'appels backend par rerun restent, eux, ceux d'un serveur à N sessions.
+def creer_session(role, pseudo):
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.secrets["SUPABASE_URL"] = "memoire://"
+    at.secrets["SUPABASE_KEY"] = "-"
+    at.session_state["joueur"] = pseudo
+    at.session_state["role"] = role
+    return at
+
+
+def tick(role, at, numero):
+    if role == "admin" and numero % 2 == 1:
+        next(b for b in at.button if b.label == "5").click().run()
+    else:
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"{role} : {at.exception[0].message}")
+
+
+def executer(nb_joueurs=10, nb_admins=1, ticks=5, latence=0.0):
+    client = peupler(FauxSupabase(latence), nb_joueurs=max(nb_joueurs, 1))
+    durees = {"joueur": [], "admin": []}
+    appels = {"joueur": [], "admin": []}
+
+    with mock.patch("supabase.create_client", lambda url, cle, options=None: client):
+        st.cache_resource.clear()  # client, caches et flux neufs, comme un serveur qui démarre
+        sessions = [("joueur", creer_session("joueur", f"joueur{i}")) for i in range(nb_joueurs)]
+        sessions += [("admin", creer_session("admin", "admin")) for _ in range(nb_admins)]
+
+        debut_total = time.perf_counter()
+        for numero in range(ticks):
+            for role, at in sessions:
+                avant = client.total_appels()
+                debut = time.perf_counter()
+                tick(role, at, numero)
+                durees[role].append((time.perf_counter() - debut) * 1000)
+                appels[role].append(client.total_appels() - avant)
+        total_s = time.perf_counter() - debut_total
+
+    reruns = sum(len(d) for d in durees.values())
+    return {
+        "parametres": {"joueurs": nb_joueurs, "admins": nb_admins, "ticks": ticks, "latence_s": latence},
+        "reruns_sequentiels_par_s": round(reruns / total_s, 2),
+        "rss_max_mo": rss_max_mo(),
+        "appels_backend": {str(k): v for k, v in client.appels.items()},
+        **{
+            role: {**resumer(durees[role]), "appels_par_rerun": round(sum(appels[role]) / len(appels[role]), 2)}
+            for role in durees if durees[role]
+        },
+    }
@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import Counter
+
+
+# ==========================
+# FAUX CLIENT SUPABASE (EN MÉMOIRE)
+# ==========================
+# Reproduit le sous-ensemble du query builder utilisé par streamlit_app.py, ainsi que les
+# fonctions SQL du dossier sql/. Chaque execute() attend `latence` secondes et est compté.
+class Reponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class Requete:
+    def __init__(self, client, table, lignes=None):
+        self.client = client
+        self.table = table
+        self.lignes = lignes  # lignes fixes (résultat de rpc) ; sinon lues dans client.tables
+        self.operation = "select"
+        self.valeurs = None
+        self.filtres = []
+        self.tris = []
+        self.plage = None
+        self.limite = None
+
+    # --- opérations ---
+    def select(self, *colonnes, **options):
+        self.operation = "select"
+        return self
+
+    def insert(self, valeurs):
+        self.operation, self.valeurs = "insert", valeurs
+        return self
+
+    def upsert(self, valeurs, on_conflict="pseudo", **options):
+        self.operation, self.valeurs = "upsert", valeurs
+        self.conflit = on_conflict.split(",")
+        return self
+
+    def update(self, valeurs):
+        self.operation, self.valeurs = "update", valeurs
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    # --- filtres ---
+    def _filtre(self, colonne, test):
+        self.filtres.append(lambda l: l.get(colonne) is not None and test(l.get(colonne)))
+        return self
+
+    def eq(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v == valeur)
+
+    def neq(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v != valeur)
+
+    def gt(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v > valeur)
+
+    def gte(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v >= valeur)
+
+    def lt(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v < valeur)
+
+    def lte(self, colonne, valeur):
+        return self._filtre(colonne, lambda v: v <= valeur)
+
+    def in_(self, colonne, valeurs):
+        valeurs = set(valeurs)
+        return self._filtre(colonne, lambda v: v in valeurs)
+
+    def ilike(self, colonne, motif):
+        motif = motif.strip("%").lower()
+        return self._filtre(colonne, lambda v: motif in str(v).lower())
+
+    # --- tri et pagination ---
+    def order(self, colonne, desc=False):
+        self.tris.append((colonne, desc))
+        return self
+
+    def range(self, debut, fin):
+        self.plage = (debut, fin)
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def execute(self):
+        self.client.compter(self.table, self.operation)
+        with self.client.verrou:
+            return Reponse(self._executer())
+
+    def _executer(self):
+        tables = self.client.tables
+        source = self.lignes if self.lignes is not None else tables.setdefault(self.table, [])
+        choisies = [l for l in source if all(f(l) for f in self.filtres)]
+
+        if self.operation == "select":
+            for colonne, desc in reversed(self.tris):
+                choisies.sort(key=lambda l: (l.get(colonne) is None, "" if l.get(colonne) is None else l.get(colonne)), reverse=desc)
+            if self.plage is not None:
+                choisies = choisies[self.plage[0]:self.plage[1] + 1]
+            if self.limite is not None:
+                choisies = choisies[:self.limite]
+            return [dict(l) for l in choisies]
+
+        if self.operation in ("insert", "upsert"):
+            nouvelles = self.valeurs if isinstance(self.valeurs, list) else [self.valeurs]
+            if self.operation == "upsert":
+                cle = lambda l: tuple(l.get(c) for c in self.conflit)
+                cles = {cle(l) for l in nouvelles}
+                tables[self.table] = source = [l for l in source if cle(l) not in cles]
+            source.extend(dict(l) for l in nouvelles)
+            return [dict(l) for l in nouvelles]
+
+        if self.operation == "update":
+            for l in choisies:
+                l.update(self.valeurs)
+            return [dict(l) for l in choisies]
+
+        if self.operation == "delete":
+            ids = {id(l) for l in choisies}
+            tables[self.table] = [l for l in source if id(l) not in ids]
+            return [dict(l) for l in choisies]
+
+        raise ValueError(self.operation)
+
+
+class FauxSupabase:
+    def __init__(self, latence=0.0, tables=None):
+        self.latence = latence
+        self.tables = tables if tables is not None else {}
+        self.appels = Counter()
+        self.verrou = threading.RLock()
+
+    def compter(self, table, operation):
+        with self.verrou:
+            self.appels[(table, operation)] += 1
+        if self.latence:
+            time.sleep(self.latence)
+
+    def total_appels(self):
+        return sum(self.appels.values())
+
+    def table(self, nom):
+        return Requete(self, nom)
+
+    def rpc(self, fonction, parametres):
+        if fonction == "appliquer_mouvements":
+            return _RpcDifferee(self, fonction, lambda: self._appliquer_mouvements(parametres["mouvements"]))
+        if fonction == "inventaires_joueurs":
+            with self.verrou:
+                lignes = self._inventaires_joueurs()
+            return Requete(self, fonction, lignes)
+        raise ValueError(f"fonction inconnue : {fonction}")
+
+    # --- équivalents des fonctions SQL ---
+    def _appliquer_mouvements(self, mouvements):
+        inventaires = self.tables.setdefault("inventaires", [])
+        resultats = []
+        for m in mouvements:
+            ligne = next((l for l in inventaires if l["pseudo"] == m["pseudo"] and l["plante"] == m["plante"]), None)
+            if ligne is None:
+                ligne = {"pseudo": m["pseudo"], "plante": m["plante"], "quantite": 0}
+                inventaires.append(ligne)
+            ligne["quantite"] += m["delta"]
+            quantite = ligne["quantite"]
+            if quantite <= 0:
+                inventaires.remove(ligne)
+                quantite = 0
+            if "effet" in m:
+                self.tables.setdefault("journal_usages", []).append({
+                    "date": m["date"], "pseudo": m["pseudo"], "plante": m["plante"],
+                    "quantite": abs(m["delta"]), "effet": m["effet"],
+                })
+            if m.get("distribution"):
+                self.tables.setdefault("historique_distributions", []).append({
+                    "date": m["date"], "pseudo": m["pseudo"], "plante": m["plante"], "quantite": m["delta"],
+                })
+            resultats.append({"pseudo": m["pseudo"], "plante": m["plante"], "quantite": quantite})
+        return resultats
+
+    def _inventaires_joueurs(self):
+        lignes = []
+        for joueur in self.tables.get("joueurs", []):
+            if joueur.get("role") != "joueur":
+                continue
+            inventaire = [l for l in self.tables.get("inventaires", []) if l["pseudo"] == joueur["pseudo"]]
+            lignes += [
+                {"pseudo": joueur["pseudo"], "plante": l["plante"], "quantite": l["quantite"], "nb_plantes": len(inventaire)}
+                for l in inventaire
+            ] or [{"pseudo": joueur["pseudo"], "plante": None, "quantite": None, "nb_plantes": 0}]
+        return lignes
+
+
+class _RpcDifferee:
+    def __init__(self, client, fonction, appel):
+        self.client = client
+        self.fonction = fonction
+        self.appel = appel
+
+    def execute(self):
+        self.client.compter(self.fonction, "rpc")
+        with self.client.verrou:
+            return Reponse(self.appel())
+
+
+def peupler(client, nb_joueurs=20, plantes_par_joueur=10, nb_tirages=500):
+    # Jeu de données de test : joueurs, inventaires, journal et historique de tirages
+    tables = client.tables
+    tables["joueurs"] = [{"pseudo": f"joueur{i}", "role": "joueur", "password_hash": ""} for i in range(nb_joueurs)]
+    tables["inventaires"] = [
+        {"pseudo": f"joueur{i}", "plante": f"Plante {k}", "quantite": 1 + k % 3}
+        for i in range(nb_joueurs) for k in range(plantes_par_joueur)
+    ]
+    tables["journal_usages"] = [
+        {"date": f"2026-01-01T10:{i % 60:02d}:00+00:00", "pseudo": f"joueur{i % nb_joueurs}",
+         "plante": "Plante 0", "quantite": 1, "effet": "🌱 Plante 0 utilisée."}
+        for i in range(nb_joueurs * 5)
+    ]
+    tables["historique_tirages"] = [
+        {"date": f"2026-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}+00:00", "env": "Forêts", "plante": f"Plante {i % 50}"}
+        for i in range(nb_tirages)
+    ]
+    tables["historique_distributions"] = []
+    return client
@@ -0,0 +1,30 @@
+import resource
+import statistics
+import sys
+import time
+
+
+def chronometrer(fonction, repetitions=5):
+    # Durées en millisecondes de `repetitions` appels successifs
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def resumer(durees):
+    ordonnees = sorted(durees)
+    return {
+        "n": len(ordonnees),
+        "p50_ms": round(statistics.median(ordonnees), 4),
+        "p99_ms": round(ordonnees[min(len(ordonnees) - 1, int(len(ordonnees) * 0.99))], 4),
+        "min_ms": round(ordonnees[0], 4),
+    }
+
+
+def rss_max_mo():
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
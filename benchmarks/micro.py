@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from catalogue import charger_table, tirer_lot
+from benchmarks.mesures import chronometrer, resumer
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = ["Collines.csv", "Forets.csv", "Plaines.csv", "Montagnes.csv", "Marais.csv", "Sous-sols.csv"]
+TAILLES_TIRAGE = [1, 5, 100, 1000, 100_000]
+
+
+# ==========================
+# MICRO-BENCHMARKS
+# ==========================
+def bench_chargement(repetitions=5):
+    # à froid : compilation + écriture du cache ; à chaud : relecture mmap du cache
+    resultats = {}
+    for nom in CSV:
+        chemin = os.path.join(RACINE, nom)
+        with tempfile.TemporaryDirectory() as dossier:
+            froid = []
+            for i in range(repetitions):
+                froid += chronometrer(lambda: charger_table(chemin, os.path.join(dossier, str(i))), 1)
+            chaud = chronometrer(lambda: charger_table(chemin, os.path.join(dossier, "0")), repetitions)
+        resultats[nom] = {"froid": resumer(froid), "chaud": resumer(chaud)}
+    return resultats
+
+
+def bench_tirage(repetitions=20):
+    with tempfile.TemporaryDirectory() as dossier:
+        data = charger_table(os.path.join(RACINE, "Forets.csv"), dossier)
+        return {
+            str(nb): resumer(chronometrer(lambda: tirer_lot(data, nb, 0), repetitions))
+            for nb in TAILLES_TIRAGE
+        }
+
+
+def executer(repetitions=5):
+    return {"chargement": bench_chargement(repetitions), "tirage": bench_tirage(repetitions * 4)}
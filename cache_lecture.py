@@ -0,0 +1,65 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+# ==========================
+# CACHE DE LECTURE (TTL + LRU)
+# ==========================
+# Clés : tuples (nom_de_la_lecture, *arguments). Les écritures invalident par préfixe de clé,
+# ex. ("get_inventaire", pseudo) ou ("verifier_login", pseudo) pour tous les hash de ce joueur.
+class CacheLecture:
+    def __init__(self, capacite=1024, ttl=30.0):
+        self.capacite = capacite
+        self.ttl = ttl
+        self._verrou = threading.Lock()
+        self._entrees = OrderedDict()  # cle -> (expiration, valeur)
+        self._generation = 0  # incrémentée à chaque invalidation
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def lire(self, cle, calcul):
+        maintenant = time.monotonic()
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] > maintenant:
+                self._entrees.move_to_end(cle)
+                self.stats["hits"] += 1
+                return entree[1]
+            self.stats["misses"] += 1
+            generation = self._generation
+
+        valeur = calcul()
+
+        with self._verrou:
+            if generation != self._generation:
+                return valeur  # une écriture a eu lieu pendant la lecture : on ne garde rien
+            self._entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.capacite:
+                self._entrees.popitem(last=False)
+                self.stats["evictions"] += 1
+        return valeur
+
+    def invalider(self, *prefixe):
+        with self._verrou:
+            cles = [c for c in self._entrees if c[:len(prefixe)] == prefixe]
+            for cle in cles:
+                del self._entrees[cle]
+            self._generation += 1
+            self.stats["invalidations"] += len(cles)
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def memoiser(self, fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args):
+            return self.lire((fonction.__name__, *args), lambda: fonction(*args))
+        enveloppe.sans_cache = fonction
+        return enveloppe
@@ -0,0 +1,476 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ==========================
+# CONFIGURATION
+# ==========================
+# Incrémenter à chaque changement du format compilé pour invalider les anciens caches
+VERSION_FORMAT = 1
+DOSSIER_CACHE = os.environ.get("BOTANIQUE_CACHE", ".cache_tables")
+
+COLONNES = ["Nom", "Usage", "Habitat", "Informations", "Rarete", "Debut", "Fin", "Proliferation"]
+AUCUNE = -1  # case vide de la table de tirage
+
+
+# ==========================
+# LECTURE CSV
+# ==========================
+def lire_csv(chemin):
+    df = pd.read_csv(chemin, sep=";", encoding="cp1252", low_memory=False)
+    df = df.iloc[:, :8].copy()
+    df.columns = COLONNES
+
+    # Remplacement des ?? par '
+    df = df.apply(lambda col: col.str.replace("??", "'", regex=False) if col.dtype == "object" else col)
+
+    df["Debut"] = pd.to_numeric(df["Debut"], errors="coerce").fillna(0).astype(int)
+    df["Fin"] = pd.to_numeric(df["Fin"], errors="coerce").fillna(1000).astype(int)
+    df["Rarete"] = pd.to_numeric(df["Rarete"], errors="coerce").fillna(0)
+    return df.reset_index(drop=True)
+
+
+# ==========================
+# COMPILATION
+# ==========================
+def compiler_slots(df):
+    # case -> indice de ligne ; en cas de chevauchement la dernière ligne l'emporte
+    if df.empty:
+        return np.empty(0, dtype=np.int32)
+    slots = np.full(int(df["Fin"].max()) + 1, AUCUNE, dtype=np.int32)
+    for i, (debut, fin) in enumerate(zip(df["Debut"].to_numpy(), df["Fin"].to_numpy())):
+        if debut <= fin:
+            slots[max(debut, 0):fin + 1] = i
+    return slots
+
+
+def cumul_poids(slots, n_lignes):
+    # poids de chaque ligne = nombre de cases valides qu'elle occupe (la case 0 n'est jamais tirée)
+    valides = np.asarray(slots[1:])
+    valides = valides[valides != AUCUNE]
+    return np.cumsum(np.bincount(valides, minlength=n_lignes), dtype=np.int64)
+
+
+def construire_lookup(df):
+    return {nom: i for i, nom in enumerate(df["Nom"])}
+
+
+def empreinte(chemin):
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+# ==========================
+# CACHE DISQUE
+# ==========================
+def _chemins_cache(chemin, dossier):
+    base = os.path.splitext(os.path.basename(chemin))[0]
+    prefixe = os.path.join(dossier, f"{base}-{empreinte(chemin)[:20]}-v{VERSION_FORMAT}")
+    return prefixe + ".slots.npy", prefixe + ".catalogue.pkl"
+
+
+def _ecrire_atomique(chemin, ecrire):
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    ecrire(tmp)
+    os.replace(tmp, chemin)
+
+
+def _sauver_npy(chemin, tableau):
+    # np.save ajoute ".npy" aux noms sans extension : on passe par un handle
+    with open(chemin, "wb") as f:
+        np.save(f, tableau)
+
+
+def _table(slots, df):
+    return {"table": slots, "df": df, "lookup": construire_lookup(df), "cumul": cumul_poids(slots, len(df))}
+
+
+def _table_vide():
+    return _table(np.empty(0, dtype=np.int32), pd.DataFrame(columns=COLONNES))
+
+
+def charger_table(chemin, dossier_cache=DOSSIER_CACHE):
+    try:
+        fichier_slots, fichier_df = _chemins_cache(chemin, dossier_cache)
+    except OSError:
+        return _table_vide()
+
+    if os.path.exists(fichier_slots) and os.path.exists(fichier_df):
+        try:
+            df = pd.read_pickle(fichier_df)
+            slots = np.load(fichier_slots, mmap_mode="r")
+            return _table(slots, df)
+        except Exception:
+            pass  # cache corrompu : on recompile
+
+    try:
+        df = lire_csv(chemin)
+    except Exception:
+        return _table_vide()
+    slots = compiler_slots(df)
+
+    try:
+        os.makedirs(dossier_cache, exist_ok=True)
+        _ecrire_atomique(fichier_slots, lambda p: _sauver_npy(p, slots))
+        _ecrire_atomique(fichier_df, lambda p: df.to_pickle(p))
+        slots = np.load(fichier_slots, mmap_mode="r")
+    except OSError:
+        pass  # dossier en lecture seule : on garde la version en mémoire
+
+    return _table(slots, df)
+
+
+# ==========================
+# TIRAGE
+# ==========================
+def generateur(graine=None):
+    # accepte une graine entière, un np.random.Generator existant ou None
+    return np.random.default_rng(graine)
+
+
+def tirer_indices(data, nb, graine=None):
+    cumul = data["cumul"]
+    if nb <= 0 or len(cumul) == 0 or cumul[-1] == 0:
+        return np.empty(0, dtype=np.int64)
+    u = generateur(graine).integers(0, cumul[-1], size=nb)
+    return np.searchsorted(cumul, u, side="right")
+
+
+def tirer_lot(data, nb, graine=None):
+    return data["df"].iloc[tirer_indices(data, nb, graine)]
+
+
+def tirer_expedition(fichiers, demandes, graine=None):
+    # demandes : {environnement: nombre de tirages} ; un seul flux aléatoire pour tout le lot
+    rng = generateur(graine)
+    morceaux = []
+    for env, nb in demandes.items():
+        tirage = tirer_lot(fichiers[env], nb, rng)
+        morceaux.append(tirage.assign(Environnement=env))
+    if not morceaux:
+        return pd.DataFrame(columns=COLONNES + ["Environnement"])
+    return pd.concat(morceaux, ignore_index=True)
+
+
+# ==========================
+# INDEX GLOBAL DES PLANTES
+# ==========================
+# (catégorie, icône, marqueurs recherchés dans l'usage, message d'effet) — testés dans l'ordre
+CATEGORIES = [
+    ("soin", "❤️", ("soin", "médic", "guér", "curatif"), "{icone} {nom} utilisée pour ses vertus médicinales."),
+    ("toxique", "☠️", ("tox", "poison"), "{icone} {nom} manipulée avec prudence (toxique)."),
+    ("aliment", "🍽️", ("aliment",), "{icone} {nom} consommée."),
+    ("arome", "🌿", ("arom",), "{icone} {nom} utilisée pour son arôme."),
+    ("magie", "✨", ("mag",), "{icone} {nom} intégrée à un rituel."),
+    ("materiel", "🪵", ("bois", "résine"), "{icone} {nom} transformée pour un usage matériel."),
+]
+CATEGORIE_DEFAUT = ("autre", "🌱", (), "{icone} {nom} utilisée.")
+
+
+def classer_usage(usage):
+    usage_lower = str(usage).lower()
+    for categorie in CATEGORIES:
+        if any(m in usage_lower for m in categorie[2]):
+            return categorie
+    return CATEGORIE_DEFAUT
+
+
+class FichePlante:
+    __slots__ = ("nom", "env", "ligne", "usage", "habitat", "informations", "rarete", "proliferation",
+                 "categorie", "icone", "effet", "etoiles", "champignon")
+
+    def __init__(self, nom, env, ligne, usage, habitat, informations, rarete, proliferation):
+        self.nom = nom
+        self.env = env
+        self.ligne = ligne
+        self.usage = usage
+        self.habitat = habitat
+        self.informations = informations
+        self.rarete = rarete
+        self.proliferation = proliferation
+        self.categorie, self.icone, _, gabarit = classer_usage(usage)
+        self.effet = gabarit.format(icone=self.icone, nom=nom)
+        self.etoiles = min(max(-int(rarete), 0), 5)
+        self.champignon = "champignon" in str(usage).lower()
+
+    @property
+    def herbe(self):
+        return not self.champignon
+
+
+class Catalogue:
+    __slots__ = ("par_nom", "par_biome")
+
+    def __init__(self, fichiers):
+        # par_nom : nom -> fiches dans l'ordre des biomes ; par_biome : env -> fiches par indice de ligne
+        self.par_nom = {}
+        self.par_biome = {}
+        for env, data in fichiers.items():
+            df = data["df"]
+            fiches = [
+                FichePlante(nom, env, i, *valeurs)
+                for i, (nom, *valeurs) in enumerate(zip(
+                    df["Nom"], df["Usage"], df["Habitat"], df["Informations"], df["Rarete"], df["Proliferation"]
+                ))
+            ]
+            self.par_biome[env] = fiches
+            biome = {}
+            for fiche in fiches:
+                biome[fiche.nom] = fiche  # doublon dans un même biome : la dernière ligne l'emporte
+            for nom, fiche in biome.items():
+                self.par_nom.setdefault(nom, []).append(fiche)
+
+    def __contains__(self, nom):
+        return nom in self.par_nom
+
+    def fiche(self, nom, env=None):
+        fiches = self.par_nom.get(nom)
+        if not fiches:
+            return None
+        if env is None:
+            return fiches[0]
+        return next((f for f in fiches if f.env == env), None)
+
+    def biomes(self, nom):
+        return [f.env for f in self.par_nom.get(nom, ())]
+
+    def message_effet(self, nom):
+        fiche = self.fiche(nom)
+        if fiche is not None:
+            return fiche.effet
+        categorie = CATEGORIE_DEFAUT
+        return categorie[3].format(icone=categorie[1], nom=nom)
+
+
+# ==========================
+# INDEX DE RECHERCHE
+# ==========================
+# Index inversé (jetons exacts et préfixes) complété par un index de trigrammes pour les fautes
+# de frappe. Texte normalisé sans accents ; "?" et apostrophes (restes de "??" cp1252) séparent les mots.
+POIDS_CHAMPS = {"nom": 5.0, "usage": 3.0, "habitat": 2.0, "informations": 1.0, "proliferation": 0.5}
+SIMILARITE_MIN = 0.4  # coefficient de Dice minimal entre trigrammes pour une correspondance approchée
+_SEPARATEURS = re.compile(r"[^0-9a-z]+")
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize("NFKD", str(texte).lower())
+    return "".join(c for c in texte if not unicodedata.combining(c))
+
+
+def jetons(texte):
+    return [j for j in _SEPARATEURS.split(normaliser(texte)) if len(j) > 1]
+
+
+def trigrammes(jeton):
+    jeton = f"  {jeton} "
+    return {jeton[i:i + 3] for i in range(len(jeton) - 2)}
+
+
+class IndexRecherche:
+    __slots__ = ("fiches", "postings", "vocabulaire", "par_trigramme", "trigrammes_jeton")
+
+    def __init__(self, catalogue):
+        self.fiches = [f for fiches in catalogue.par_biome.values() for f in fiches]
+        self.postings = {}  # jeton -> {indice de fiche: poids}
+        for i, fiche in enumerate(self.fiches):
+            for champ, poids in POIDS_CHAMPS.items():
+                for jeton in jetons(getattr(fiche, champ)):
+                    postings = self.postings.setdefault(jeton, {})
+                    postings[i] = postings.get(i, 0.0) + poids
+
+        self.vocabulaire = sorted(self.postings)
+        self.par_trigramme = {}  # trigramme -> jetons du vocabulaire
+        self.trigrammes_jeton = {}
+        for jeton in self.vocabulaire:
+            tri = trigrammes(jeton)
+            self.trigrammes_jeton[jeton] = len(tri)
+            for t in tri:
+                self.par_trigramme.setdefault(t, []).append(jeton)
+
+    def _correspondances(self, jeton, prefixe):
+        # jeton -> facteur de confiance : exact 1, préfixe 0.8, approché = similarité de Dice
+        trouves = {}
+        if jeton in self.postings:
+            trouves[jeton] = 1.0
+        if prefixe:
+            debut = bisect_left(self.vocabulaire, jeton)
+            for candidat in self.vocabulaire[debut:]:
+                if not candidat.startswith(jeton):
+                    break
+                trouves.setdefault(candidat, 0.8)
+        tri = trigrammes(jeton)
+        communs = Counter(c for t in tri for c in self.par_trigramme.get(t, ()))
+        for candidat, n in communs.items():
+            dice = 2 * n / (len(tri) + self.trigrammes_jeton[candidat])
+            if dice >= SIMILARITE_MIN and dice * 0.7 > trouves.get(candidat, 0.0):
+                trouves[candidat] = dice * 0.7
+        return trouves
+
+    def rechercher(self, requete, limite=20):
+        mots = jetons(requete)
+        scores = {}
+        for k, mot in enumerate(mots):
+            # le dernier mot est en cours de frappe : on accepte les préfixes
+            for candidat, confiance in self._correspondances(mot, prefixe=k == len(mots) - 1).items():
+                for i, poids in self.postings[candidat].items():
+                    scores[i] = scores.get(i, 0.0) + confiance * poids
+        meilleurs = sorted(scores.items(), key=lambda s: -s[1])[:limite]
+        return [self.fiches[i] for i, _ in meilleurs]
+
+
+# ==========================
+# TIRAGES FILTRÉS ET PONDÉRÉS
+# ==========================
+PONDERATIONS = {
+    "cases": "selon les plages Debut/Fin (comme un tirage normal)",
+    "uniforme": "toutes les plantes retenues à égalité",
+    "rarete": "poids 2^Rareté : chaque point de rareté divise la chance par deux",
+}
+
+
+class RequeteTirage:
+    # Requête hashable : sert de clé au cache des tables compilées
+    __slots__ = ("biomes", "categories", "champignon", "rarete_min", "rarete_max", "habitat", "usage", "ponderation")
+
+    def __init__(self, biomes, categories=(), champignon=None, rarete_min=None, rarete_max=None,
+                 habitat="", usage="", ponderation="cases"):
+        if ponderation not in PONDERATIONS:
+            raise ValueError(f"pondération inconnue : {ponderation}")
+        self.biomes = tuple(sorted(biomes))
+        self.categories = tuple(sorted(categories))
+        self.champignon = champignon
+        self.rarete_min = rarete_min
+        self.rarete_max = rarete_max
+        self.habitat = normaliser(habitat).strip()
+        self.usage = normaliser(usage).strip()
+        self.ponderation = ponderation
+
+    def _cle(self):
+        return tuple(getattr(self, nom) for nom in self.__slots__)
+
+    def __eq__(self, autre):
+        return isinstance(autre, RequeteTirage) and self._cle() == autre._cle()
+
+    def __hash__(self):
+        return hash(self._cle())
+
+
+class TableEchantillonnage:
+    # Méthode des alias (Vose) : chaque tirage coûte O(1) quel que soit le nombre de plantes
+    __slots__ = ("df", "probas", "alias", "octets")
+
+    def __init__(self, df, poids):
+        # seules les lignes de poids > 0 sont tirables : poids total nul => table vide
+        tirables = np.asarray(poids) > 0
+        self.df = df[tirables]
+        poids = np.asarray(poids, dtype=float)[tirables]
+        n = len(poids)
+        self.probas = np.zeros(n)
+        self.alias = np.zeros(n, dtype=np.int32)
+        if n:
+            echelle = poids * n / poids.sum()
+            petits = [i for i in range(n) if echelle[i] < 1.0]
+            grands = [i for i in range(n) if echelle[i] >= 1.0]
+            while petits and grands:
+                p, g = petits.pop(), grands.pop()
+                self.probas[p] = echelle[p]
+                self.alias[p] = g
+                echelle[g] -= 1.0 - echelle[p]
+                (petits if echelle[g] < 1.0 else grands).append(g)
+            for i in petits + grands:
+                self.probas[i] = 1.0
+        self.octets = self.probas.nbytes + self.alias.nbytes + int(self.df.memory_usage(index=True, deep=True).sum())
+
+    def __len__(self):
+        return len(self.probas)
+
+    def tirer(self, nb, graine=None):
+        if nb <= 0 or len(self) == 0:
+            return self.df.iloc[[]]
+        rng = generateur(graine)
+        i = rng.integers(0, len(self), size=nb)
+        indices = np.where(rng.random(nb) < self.probas[i], i, self.alias[i])
+        return self.df.iloc[indices]
+
+
+class TiragesFiltres:
+    # Compile chaque requête distincte en TableEchantillonnage, gardée dans un LRU borné en octets
+    def __init__(self, fichiers, catalogue, capacite_octets=8 << 20):
+        self.fichiers = fichiers
+        self.catalogue = catalogue
+        self.capacite_octets = capacite_octets
+        self.octets = 0
+        self._verrou = threading.Lock()
+        self._tables = OrderedDict()
+        self.stats = {"hits": 0, "compilations": 0, "evictions": 0}
+
+    def compiler(self, requete):
+        morceaux, poids = [], []
+        for env in requete.biomes:
+            data = self.fichiers[env]
+            df = data["df"]
+            if df.empty:
+                continue
+            fiches = self.catalogue.par_biome[env]
+            masque = np.ones(len(df), dtype=bool)
+            if requete.categories:
+                masque &= np.array([f.categorie in requete.categories for f in fiches])
+            if requete.champignon is not None:
+                masque &= np.array([f.champignon == requete.champignon for f in fiches])
+            if requete.rarete_min is not None:
+                masque &= df["Rarete"].to_numpy() >= requete.rarete_min
+            if requete.rarete_max is not None:
+                masque &= df["Rarete"].to_numpy() <= requete.rarete_max
+            if requete.habitat:
+                masque &= np.array([requete.habitat in normaliser(h) for h in df["Habitat"]])
+            if requete.usage:
+                masque &= np.array([requete.usage in normaliser(u) for u in df["Usage"]])
+
+            cases = np.diff(data["cumul"], prepend=0).astype(float)
+            if requete.ponderation == "uniforme":
+                p = (cases > 0).astype(float)
+            elif requete.ponderation == "rarete":
+                p = (cases > 0) * np.exp2(df["Rarete"].to_numpy(dtype=float))
+            else:
+                p = cases
+            morceaux.append(df[masque].assign(Environnement=env))
+            poids.append(p[masque])
+
+        if not morceaux:
+            return TableEchantillonnage(pd.DataFrame(columns=COLONNES + ["Environnement"]), np.zeros(0))
+        return TableEchantillonnage(pd.concat(morceaux), np.concatenate(poids))
+
+    def table(self, requete):
+        with self._verrou:
+            table = self._tables.get(requete)
+            if table is not None:
+                self._tables.move_to_end(requete)
+                self.stats["hits"] += 1
+                return table
+        table = self.compiler(requete)
+        with self._verrou:
+            self.stats["compilations"] += 1
+            if requete not in self._tables:
+                self._tables[requete] = table
+                self.octets += table.octets
+            while self.octets > self.capacite_octets and len(self._tables) > 1:
+                _, ancienne = self._tables.popitem(last=False)
+                self.octets -= ancienne.octets
+                self.stats["evictions"] += 1
+        return table
+
+    def tirer(self, requete, nb, graine=None):
+        return self.table(requete).tirer(nb, graine)
+
+    def __len__(self):
+        return len(self._tables)
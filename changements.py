@@ -0,0 +1,53 @@
+import threading
+import time
+
+INVENTAIRE = "inventaire"
+JOURNAL = "journal"
+
+
+# ==========================
+# FLUX DE CHANGEMENTS
+# ==========================
+# Compteur de version par (joueur, sujet), partagé par toutes les sessions du processus.
+# Chaque écriture passe par signaler() ; une session ne relit la base que si la version
+# a bougé, ou quand l'intervalle de secours expire (écritures faites hors de ce processus).
+# L'intervalle de secours double tant que les données ne changent pas, jusqu'à intervalle_max.
+class FluxChangements:
+    def __init__(self, intervalle_min=5.0, intervalle_max=60.0):
+        self.intervalle_min = intervalle_min
+        self.intervalle_max = intervalle_max
+        self._verrou = threading.Lock()
+        self._versions = {}
+        self.stats = {"notifications": 0, "sondages": 0, "sondages_evites": 0}
+
+    def signaler(self, pseudo, *sujets):
+        with self._verrou:
+            for sujet in sujets:
+                cle = (pseudo, sujet)
+                self._versions[cle] = self._versions.get(cle, 0) + 1
+            self.stats["notifications"] += len(sujets)
+
+    def version(self, pseudo, sujet):
+        return self._versions.get((pseudo, sujet), 0)
+
+    def relire(self, etat, pseudo, sujet, lecture, maintenant=None):
+        # etat : valeur retournée par l'appel précédent (None au premier appel)
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        version = self.version(pseudo, sujet)
+        if etat is not None and etat["version"] == version and maintenant < etat["echeance"]:
+            with self._verrou:
+                self.stats["sondages_evites"] += 1
+            return etat
+
+        donnees = lecture()
+        if etat is None or etat["version"] != version or donnees != etat["donnees"]:
+            intervalle = self.intervalle_min
+        else:
+            intervalle = min(etat["intervalle"] * 2, self.intervalle_max)
+        with self._verrou:
+            self.stats["sondages"] += 1
+        return {"version": version, "echeance": maintenant + intervalle, "intervalle": intervalle, "donnees": donnees}
+
+    def taux_evites(self):
+        total = self.stats["sondages"] + self.stats["sondages_evites"]
+        return self.stats["sondages_evites"] / total if total else 0.0
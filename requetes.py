@@ -0,0 +1,54 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ==========================
+# REQUÊTES CONCURRENTES
+# ==========================
+# Pool de threads partagé par le processus pour lancer ensemble des lectures/écritures Supabase
+# indépendantes. Le client HTTP sous-jacent (httpx) est thread-safe et borne lui-même le nombre
+# de connexions ; `taille` threads au plus attendent le réseau en même temps.
+# Un appel qui dépasse `timeout` est abandonné : les appels pas encore partis sont annulés,
+# ceux déjà en vol se terminent par le timeout du client HTTP.
+# Ne pas appeler en_parallele() depuis une fonction elle-même exécutée par le pool.
+class ExecuteurRequetes:
+    def __init__(self, taille=8, timeout=10.0):
+        self.taille = taille
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=taille, thread_name_prefix="requetes")
+        self._verrou = threading.Lock()
+        self.stats = {"lots": 0, "appels": 0, "timeouts": 0, "annulations": 0, "erreurs": 0}
+
+    def soumettre(self, fonction, *args):
+        # appel en arrière-plan (préchargement) : le résultat n'est pas attendu
+        with self._verrou:
+            self.stats["appels"] += 1
+        return self._pool.submit(fonction, *args)
+
+    def en_parallele(self, *appels, timeout=None):
+        # appels : fonctions sans argument ; résultats dans le même ordre
+        echeance = time.monotonic() + (self.timeout if timeout is None else timeout)
+        futures = [self._pool.submit(appel) for appel in appels]
+        with self._verrou:
+            self.stats["lots"] += 1
+            self.stats["appels"] += len(futures)
+        try:
+            return [f.result(timeout=max(0.0, echeance - time.monotonic())) for f in futures]
+        except TimeoutError:
+            self._compter("timeouts")
+            raise
+        except Exception:
+            self._compter("erreurs")
+            raise
+        finally:
+            annules = sum(f.cancel() for f in futures)
+            if annules:
+                self._compter("annulations", annules)
+
+    def _compter(self, cle, n=1):
+        with self._verrou:
+            self.stats[cle] += n
+
+    def arreter(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,198 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from catalogue import AUCUNE, compiler_slots, cumul_poids, lire_csv, tirer_indices
+
+TIRAGES_PAR_LOT = 1_000_000  # un lot = une tâche du pool, avec son propre flux aléatoire
+
+
+# ==========================
+# ANALYSE STATIQUE DES PLAGES
+# ==========================
+def cases_declarees(df, n_cases):
+    # cases 1..n_cases couvertes par la plage Debut/Fin telle qu'écrite dans le CSV
+    debut = np.clip(df["Debut"].to_numpy(), 1, None)
+    fin = np.clip(df["Fin"].to_numpy(), None, n_cases)
+    return np.clip(fin - debut + 1, 0, None)
+
+
+def chevauchements(df, slots):
+    # lignes dont une partie de la plage est écrasée par une ligne suivante (compiler_slots)
+    conflits = []
+    for i, (debut, fin) in enumerate(zip(df["Debut"].to_numpy(), df["Fin"].to_numpy())):
+        if debut > fin:
+            continue
+        proprietaires = slots[max(debut, 1):fin + 1]
+        perdues = proprietaires != i
+        if perdues.any():
+            conflits.append({
+                "ligne": i,
+                "plante": df["Nom"].iat[i],
+                "plage": f"{debut}-{fin}",
+                "cases_perdues": int(perdues.sum()),
+                "ecrasee_par": [df["Nom"].iat[j] for j in np.unique(proprietaires[perdues]) if j != AUCUNE],
+            })
+    return conflits
+
+
+# ==========================
+# SIMULATION
+# ==========================
+def _simuler_lot(cumul, nb, graine):
+    # même tirage que le jeu (catalogue.tirer_indices) : seules les cases occupées sont tirées
+    return np.bincount(tirer_indices({"cumul": cumul}, nb, graine), minlength=len(cumul))
+
+
+def intervalle_wilson(succes, n, z):
+    p = succes / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    marge = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return centre - marge, centre + marge
+
+
+def simuler(chemins, tirages=10_000_000, processus=None, graine=None, confiance=0.95):
+    tables = {}
+    for chemin in chemins:
+        df = lire_csv(chemin)
+        slots = compiler_slots(df)
+        tables[os.path.splitext(os.path.basename(chemin))[0]] = (df, slots, cumul_poids(slots, len(df)))
+
+    # découpage fixe en lots : le résultat ne dépend que de la graine, pas du nombre de processus
+    taches = []
+    for biome, (df, slots, cumul) in tables.items():
+        if len(cumul) == 0 or cumul[-1] == 0:
+            continue
+        for debut in range(0, tirages, TIRAGES_PAR_LOT):
+            taches.append((biome, min(TIRAGES_PAR_LOT, tirages - debut)))
+    graines = np.random.SeedSequence(graine).spawn(len(taches))
+
+    comptes = {}
+    if processus == 1:
+        resultats = [_simuler_lot(tables[b][2], nb, g) for (b, nb), g in zip(taches, graines)]
+    else:
+        with ProcessPoolExecutor(max_workers=processus) as pool:
+            resultats = list(pool.map(
+                _simuler_lot, [tables[b][2] for b, _ in taches], [nb for _, nb in taches], graines
+            ))
+    for (biome, _), compte in zip(taches, resultats):
+        comptes[biome] = comptes[biome] + compte if biome in comptes else compte
+
+    return {biome: rapport_biome(df, slots, cumul, comptes.get(biome), confiance)
+            for biome, (df, slots, cumul) in tables.items()}
+
+
+def rapport_biome(df, slots, cumul, compte, confiance):
+    # Probabilités conditionnelles à un tirage réussi, comme en jeu : les cases vides ne sont
+    # jamais tirées. Déclarée : part des cases écrites dans le CSV ; Effective : part des cases
+    # possédées après compilation (chevauchements) ; Empirique : fréquence simulée.
+    n_cases = len(slots) - 1
+    if n_cases < 1:
+        return {"tirages": 0, "cases": 0, "plantes": [], "chevauchements": [], "plages_invalides": []}
+    rapport = {
+        "tirages": 0,
+        "cases": n_cases,
+        "trous": int((slots[1:] == AUCUNE).sum()),
+        "taux_rejet_theorique": float((slots[1:] == AUCUNE).mean()),
+        "plantes": [],
+        "chevauchements": chevauchements(df, slots),
+        "plages_invalides": df.loc[df["Debut"] > df["Fin"], "Nom"].tolist(),
+    }
+    if compte is None:
+        return rapport
+    n = int(compte.sum())
+    declaree = cases_declarees(df, n_cases)
+    declaree = declaree / declaree.sum()
+    effective = np.diff(cumul, prepend=0) / cumul[-1]
+    # correction de Bonferroni : `confiance` vaut pour l'ensemble des plantes du biome
+    z = NormalDist().inv_cdf(1 - (1 - confiance) / (2 * len(df)))
+    bas, haut = intervalle_wilson(compte, n, z)
+
+    plantes = pd.DataFrame({
+        "Plante": df["Nom"],
+        "Plage": df["Debut"].astype(str) + "-" + df["Fin"].astype(str),
+        "Déclarée": declaree,
+        "Effective": effective,
+        "Empirique": compte / n,
+        "IC bas": bas,
+        "IC haut": haut,
+    })
+    plantes["Hors IC"] = (plantes["Déclarée"] < bas) | (plantes["Déclarée"] > haut)
+    return {**rapport, "tirages": n, "plantes": plantes.to_dict("records")}
+
+
+# ==========================
+# RAPPORT
+# ==========================
+def afficher(rapports, detail=False):
+    for biome, r in rapports.items():
+        print(f"\n=== {biome} : {r['tirages']:,} tirages sur {r['cases']} cases ===")
+        if not r["cases"]:
+            print("table vide")
+            continue
+        print(f"trous : {r['trous']} case(s) sans plante ({r['taux_rejet_theorique']:.4%} du dé 1..max), "
+              f"ignorées au tirage")
+        for c in r["chevauchements"]:
+            print(f"chevauchement : {c['plante']} ({c['plage']}) perd {c['cases_perdues']} case(s) "
+                  f"au profit de {', '.join(c['ecrasee_par'])}")
+        for nom in r["plages_invalides"]:
+            print(f"plage invalide (Debut > Fin, jamais tirée) : {nom}")
+        if not r["plantes"]:
+            continue
+        plantes = pd.DataFrame(r["plantes"])
+        if not detail:
+            plantes = plantes[plantes["Hors IC"]]
+        if not plantes.empty:
+            print(plantes.to_string(index=False, float_format=lambda x: f"{x:.5f}"))
+
+
+def anomalies(rapports, max_rejet=None):
+    total = 0
+    for r in rapports.values():
+        total += len(r["chevauchements"]) + len(r["plages_invalides"])
+        if max_rejet is not None and r["cases"] and r["taux_rejet_theorique"] > max_rejet:
+            total += 1
+    return total
+
+
+# ==========================
+# POINT D'ENTRÉE : python -m simulation
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation Monte Carlo des tables de tirage.")
+    parser.add_argument("csv", nargs="*", help="fichiers CSV (défaut : tous les .csv du dossier courant)")
+    parser.add_argument("--tirages", type=int, default=10_000_000, help="tirages par biome")
+    parser.add_argument("--processus", type=int, default=None, help="taille du pool (défaut : nombre de CPU)")
+    parser.add_argument("--graine", type=int, default=None)
+    parser.add_argument("--confiance", type=float, default=0.95, help="niveau de confiance global par biome")
+    parser.add_argument("--detail", action="store_true", help="afficher toutes les plantes, pas seulement les écarts")
+    parser.add_argument("--json", help="écrire le rapport complet dans ce fichier")
+    parser.add_argument("--max-rejet", type=float, default=None, help="taux de cases vides toléré avec --strict")
+    parser.add_argument("--strict", action="store_true", help="code de sortie non nul en cas d'anomalie")
+    args = parser.parse_args(argv)
+
+    chemins = args.csv or sorted(glob.glob("*.csv"))
+    debut = time.perf_counter()
+    rapports = simuler(chemins, args.tirages, args.processus, args.graine, args.confiance)
+    afficher(rapports, args.detail)
+    print(f"\n{len(chemins)} table(s) simulée(s) en {time.perf_counter() - debut:.1f} s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapports, f, ensure_ascii=False, indent=2)
+    n = anomalies(rapports, args.max_rejet)
+    if n:
+        print(f"{n} anomalie(s) détectée(s)")
+    return 1 if args.strict and n else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+-- Mouvements d'inventaire atomiques : un seul aller-retour, une seule transaction.
+-- À exécuter une fois dans l'éditeur SQL Supabase.
+
+create unique index if not exists inventaires_pseudo_plante_idx on inventaires (pseudo, plante);
+
+-- mouvements : [{"pseudo", "plante", "delta", "date", "effet"?, "distribution"?}, ...]
+--   delta > 0 : ajout, delta < 0 : retrait (la ligne est supprimée à 0 ou moins)
+--   effet : écrit la ligne correspondante dans journal_usages
+--   distribution : écrit la ligne correspondante dans historique_distributions
+-- Retourne [{"pseudo", "plante", "quantite"}] avec la quantité finale de chaque mouvement.
+create or replace function appliquer_mouvements(mouvements jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    m jsonb;
+    v_pseudo text;
+    v_plante text;
+    v_delta integer;
+    v_quantite integer;
+    resultats jsonb := '[]'::jsonb;
+begin
+    for m in select * from jsonb_array_elements(mouvements) loop
+        v_pseudo := m->>'pseudo';
+        v_plante := m->>'plante';
+        v_delta := (m->>'delta')::integer;
+
+        insert into inventaires as inv (pseudo, plante, quantite)
+        values (v_pseudo, v_plante, v_delta)
+        on conflict (pseudo, plante) do update set quantite = inv.quantite + excluded.quantite
+        returning inv.quantite into v_quantite;
+
+        if v_quantite <= 0 then
+            delete from inventaires inv where inv.pseudo = v_pseudo and inv.plante = v_plante;
+            v_quantite := 0;
+        end if;
+
+        if m ? 'effet' then
+            insert into journal_usages (date, pseudo, plante, quantite, effet)
+            values (m->>'date', v_pseudo, v_plante, abs(v_delta), m->>'effet');
+        end if;
+
+        if coalesce((m->>'distribution')::boolean, false) then
+            insert into historique_distributions (date, pseudo, plante, quantite)
+            values (m->>'date', v_pseudo, v_plante, v_delta);
+        end if;
+
+        resultats := resultats || jsonb_build_object('pseudo', v_pseudo, 'plante', v_plante, 'quantite', v_quantite);
+    end loop;
+    return resultats;
+end;
+$$;
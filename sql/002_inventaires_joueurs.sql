@@ -0,0 +1,13 @@
+-- Inventaires de tous les joueurs en une seule requête (onglet admin "Utilisateurs").
+-- Une ligne par (joueur, plante) ; les joueurs sans plante ont une ligne avec plante = null.
+-- nb_plantes : nombre de plantes distinctes du joueur, calculé côté serveur.
+create or replace function inventaires_joueurs()
+returns table (pseudo text, plante text, quantite integer, nb_plantes bigint)
+language sql
+stable
+as $$
+    select j.pseudo, i.plante, i.quantite, count(i.plante) over (partition by j.pseudo) as nb_plantes
+    from joueurs j
+    left join inventaires i on i.pseudo = j.pseudo
+    where j.role = 'joueur'
+$$;
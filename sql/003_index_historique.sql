@@ -0,0 +1,6 @@
+-- Index pour la pagination par curseur sur "date" et les filtres de l'historique.
+create index if not exists historique_tirages_date_idx on historique_tirages (date desc);
+create index if not exists historique_tirages_env_date_idx on historique_tirages (env, date desc);
+create index if not exists historique_distributions_pseudo_date_idx on historique_distributions (pseudo, date desc);
+create index if not exists historique_distributions_date_idx on historique_distributions (date desc);
+create index if not exists journal_usages_pseudo_date_idx on journal_usages (pseudo, date desc);
@@ -0,0 +1,56 @@
+-- Dates de l'historique et du journal en vrais timestamptz (au lieu de texte "%Y-%m-%d %H:%M:%S"),
+-- pour que le tri et les filtres par période utilisent les index de sql/003_index_historique.sql.
+-- Les anciennes valeurs texte sont interprétées dans le fuseau de la session.
+alter table historique_tirages alter column date type timestamptz using date::timestamp;
+alter table historique_distributions alter column date type timestamptz using date::timestamp;
+alter table journal_usages alter column date type timestamptz using date::timestamp;
+
+alter table historique_tirages alter column date set default now();
+alter table historique_distributions alter column date set default now();
+alter table journal_usages alter column date set default now();
+
+-- appliquer_mouvements : la date reçue est un horodatage ISO 8601
+create or replace function appliquer_mouvements(mouvements jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    m jsonb;
+    v_pseudo text;
+    v_plante text;
+    v_delta integer;
+    v_quantite integer;
+    v_date timestamptz;
+    resultats jsonb := '[]'::jsonb;
+begin
+    for m in select * from jsonb_array_elements(mouvements) loop
+        v_pseudo := m->>'pseudo';
+        v_plante := m->>'plante';
+        v_delta := (m->>'delta')::integer;
+        v_date := coalesce((m->>'date')::timestamptz, now());
+
+        insert into inventaires as inv (pseudo, plante, quantite)
+        values (v_pseudo, v_plante, v_delta)
+        on conflict (pseudo, plante) do update set quantite = inv.quantite + excluded.quantite
+        returning inv.quantite into v_quantite;
+
+        if v_quantite <= 0 then
+            delete from inventaires inv where inv.pseudo = v_pseudo and inv.plante = v_plante;
+            v_quantite := 0;
+        end if;
+
+        if m ? 'effet' then
+            insert into journal_usages (date, pseudo, plante, quantite, effet)
+            values (v_date, v_pseudo, v_plante, abs(v_delta), m->>'effet');
+        end if;
+
+        if coalesce((m->>'distribution')::boolean, false) then
+            insert into historique_distributions (date, pseudo, plante, quantite)
+            values (v_date, v_pseudo, v_plante, v_delta);
+        end if;
+
+        resultats := resultats || jsonb_build_object('pseudo', v_pseudo, 'plante', v_plante, 'quantite', v_quantite);
+    end loop;
+    return resultats;
+end;
+$$;
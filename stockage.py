@@ -0,0 +1,542 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import tomllib
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+import supabase
+
+# Colonnes de chaque table, dans l'ordre des exports ; la première sert à vider une table
+TABLES = {
+    "joueurs": ("pseudo", "role", "password_hash"),
+    "inventaires": ("pseudo", "plante", "quantite"),
+    "journal_usages": ("date", "pseudo", "plante", "quantite", "effet"),
+    "historique_tirages": ("date", "env", "plante"),
+    "historique_distributions": ("date", "pseudo", "plante", "quantite"),
+}
+HISTORIQUES = ("journal_usages", "historique_tirages", "historique_distributions")
+CLES = {"joueurs": ("pseudo",), "inventaires": ("pseudo", "plante")}  # tables mises à jour par upsert
+
+TAILLE_PAGE = 1000
+
+
+def curseur_suivant(lignes, curseur, taille):
+    # Pagination par curseur sur "date", du plus récent au plus ancien.
+    # curseur = (date de la dernière ligne lue, nb de lignes déjà lues à cette date)
+    if len(lignes) < taille:
+        return None
+    derniere = lignes[-1]["date"]
+    deja_lues = sum(1 for l in lignes if l["date"] == derniere)
+    if curseur is not None and derniere == curseur[0]:
+        deja_lues += curseur[1]
+    return derniere, deja_lues
+
+
+# ==========================
+# INTERFACE
+# ==========================
+# Toutes les lectures/écritures de l'application passent par un moteur de stockage.
+# filtres : ((colonne, opérateur, valeur), ...) avec les opérateurs PostgREST eq, neq, gt, gte, lt, lte, ilike.
+class Stockage(ABC):
+    nom = None
+
+    @abstractmethod
+    def enregistrer_joueur(self, pseudo, role, mdp_hash):
+        ...
+
+    @abstractmethod
+    def role_joueur(self, pseudo, mdp_hash):
+        ...
+
+    @abstractmethod
+    def changer_mot_de_passe(self, pseudo, mdp_hash):
+        ...
+
+    @abstractmethod
+    def joueurs(self):
+        ...
+
+    @abstractmethod
+    def supprimer_joueur(self, pseudo):
+        ...
+
+    @abstractmethod
+    def inventaire(self, pseudo):
+        ...
+
+    @abstractmethod
+    def inventaires_joueurs(self):
+        # {pseudo: {"inventaire": {plante: quantite}, "nb_plantes": n}}
+        ...
+
+    @abstractmethod
+    def appliquer_mouvements(self, mouvements):
+        # Une seule transaction : mouvements = [{"date", "pseudo", "plante", "delta", "effet"?, "distribution"?}, ...]
+        # Retourne [{"pseudo", "plante", "quantite"}] (quantité après mouvement)
+        ...
+
+    @abstractmethod
+    def inserer(self, table, lignes):
+        ...
+
+    @abstractmethod
+    def lire_page(self, table, colonnes, filtres=(), curseur=None, taille=50):
+        # -> (lignes, curseur de la page suivante ou None)
+        ...
+
+    # --- synchronisation entre moteurs ---
+    @abstractmethod
+    def lignes(self, table, filtres=()):
+        ...
+
+    @abstractmethod
+    def upserter(self, table, lignes):
+        ...
+
+    @abstractmethod
+    def supprimer(self, table, filtres):
+        ...
+
+    @abstractmethod
+    def vider(self, table):
+        ...
+
+
+# ==========================
+# MOTEUR SUPABASE
+# ==========================
+def client_supabase(url, cle, timeout=10.0, connexions=8):
+    # Connexions HTTP/2 réutilisées par tous les threads, en nombre borné
+    http = httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=httpx.Timeout(timeout),
+        limits=httpx.Limits(max_connections=connexions, max_keepalive_connections=connexions),
+    )
+    return supabase.create_client(url, cle, supabase.ClientOptions(httpx_client=http))
+
+
+class SupabaseStockage(Stockage):
+    nom = "supabase"
+
+    def __init__(self, client, requetes=None, taille_page=TAILLE_PAGE):
+        self.client = client
+        self.requetes = requetes  # ExecuteurRequetes optionnel pour les écritures indépendantes
+        self.taille_page = taille_page
+
+    def enregistrer_joueur(self, pseudo, role, mdp_hash):
+        self.client.table("joueurs").upsert({"pseudo": pseudo, "role": role, "password_hash": mdp_hash}).execute()
+
+    def role_joueur(self, pseudo, mdp_hash):
+        res = self.client.table("joueurs").select("role").eq("pseudo", pseudo).eq("password_hash", mdp_hash).execute()
+        return res.data[0]["role"] if res.data else None
+
+    def changer_mot_de_passe(self, pseudo, mdp_hash):
+        self.client.table("joueurs").update({"password_hash": mdp_hash}).eq("pseudo", pseudo).execute()
+
+    def joueurs(self):
+        res = self.client.table("joueurs").select("pseudo").eq("role", "joueur").execute()
+        return [r["pseudo"] for r in res.data]
+
+    def supprimer_joueur(self, pseudo):
+        # Tables dépendantes en parallèle, puis le joueur lui-même
+        appels = [
+            lambda t=table: self.client.table(t).delete().eq("pseudo", pseudo).execute()
+            for table in ["inventaires", "journal_usages", "historique_distributions"]
+        ]
+        if self.requetes is not None:
+            self.requetes.en_parallele(*appels)
+        else:
+            for appel in appels:
+                appel()
+        self.client.table("joueurs").delete().eq("pseudo", pseudo).execute()
+
+    def inventaire(self, pseudo):
+        res = self.client.table("inventaires").select("plante, quantite").eq("pseudo", pseudo).execute()
+        return {row["plante"]: row["quantite"] for row in res.data}
+
+    def inventaires_joueurs(self):
+        # Une requête paginée (sql/002_inventaires_joueurs.sql)
+        inventaires = {}
+        debut = 0
+        while True:
+            res = (self.client.rpc("inventaires_joueurs", {})
+                   .order("pseudo").order("plante")
+                   .range(debut, debut + self.taille_page - 1)
+                   .execute())
+            for r in res.data:
+                entree = inventaires.setdefault(r["pseudo"], {"inventaire": {}, "nb_plantes": r["nb_plantes"]})
+                if r["plante"] is not None:
+                    entree["inventaire"][r["plante"]] = r["quantite"]
+            if len(res.data) < self.taille_page:
+                return inventaires
+            debut += self.taille_page
+
+    def appliquer_mouvements(self, mouvements):
+        # fonction SQL sql/001_inventaire_atomique.sql
+        return self.client.rpc("appliquer_mouvements", {"mouvements": mouvements}).execute().data
+
+    def inserer(self, table, lignes):
+        self.client.table(table).insert(lignes).execute()
+
+    def lire_page(self, table, colonnes, filtres=(), curseur=None, taille=50):
+        # le tri secondaire sur les autres colonnes rend l'ordre stable entre lignes de même date
+        q = self.client.table(table).select(colonnes)
+        for colonne, operateur, valeur in filtres:
+            q = getattr(q, operateur)(colonne, valeur)
+        decalage = 0
+        if curseur is not None:
+            q = q.lte("date", curseur[0])
+            decalage = curseur[1]
+        q = q.order("date", desc=True)
+        for colonne in colonnes.split(", ")[1:]:
+            q = q.order(colonne)
+        lignes = q.range(decalage, decalage + taille - 1).execute().data
+        return lignes, curseur_suivant(lignes, curseur, taille)
+
+    def lignes(self, table, filtres=()):
+        debut = 0
+        while True:
+            q = self.client.table(table).select(", ".join(TABLES[table]))
+            for colonne, operateur, valeur in filtres:
+                q = getattr(q, operateur)(colonne, valeur)
+            for colonne in TABLES[table]:
+                q = q.order(colonne)
+            page = q.range(debut, debut + self.taille_page - 1).execute().data
+            yield from page
+            if len(page) < self.taille_page:
+                return
+            debut += self.taille_page
+
+    def upserter(self, table, lignes):
+        self.client.table(table).upsert(lignes, on_conflict=",".join(CLES[table])).execute()
+
+    def supprimer(self, table, filtres):
+        q = self.client.table(table).delete()
+        for colonne, operateur, valeur in filtres:
+            q = getattr(q, operateur)(colonne, valeur)
+        q.execute()
+
+    def vider(self, table):
+        # PostgREST refuse un DELETE sans filtre
+        colonne = TABLES[table][0]
+        if colonne == "date":
+            self.client.table(table).delete().gte("date", "-infinity").execute()
+        else:
+            self.client.table(table).delete().neq(colonne, "").execute()
+
+
+# ==========================
+# MOTEUR SQLITE
+# ==========================
+# Base locale (hors ligne, sans aller-retour réseau).
+# Une seule connexion partagée par tous les threads (Streamlit en crée un par rerun), sérialisée
+# par un verrou ; les requêtes à texte constant et paramètres "?" restent préparées dans son cache
+# d'instructions. WAL : un autre processus (python -m stockage) peut lire pendant une écriture.
+SCHEMA_SQLITE = """
+create table if not exists joueurs (pseudo text primary key, role text not null default 'joueur', password_hash text);
+create table if not exists inventaires (pseudo text not null, plante text not null, quantite integer not null,
+                                        primary key (pseudo, plante));
+create table if not exists journal_usages (date text not null, pseudo text, plante text, quantite integer, effet text);
+create table if not exists historique_tirages (date text not null, env text, plante text);
+create table if not exists historique_distributions (date text not null, pseudo text, plante text, quantite integer);
+create index if not exists joueurs_role_idx on joueurs (role);
+create index if not exists journal_usages_pseudo_date_idx on journal_usages (pseudo, date desc);
+create index if not exists historique_tirages_date_idx on historique_tirages (date desc);
+create index if not exists historique_tirages_env_date_idx on historique_tirages (env, date desc);
+create index if not exists historique_distributions_date_idx on historique_distributions (date desc);
+create index if not exists historique_distributions_pseudo_date_idx on historique_distributions (pseudo, date desc);
+"""
+
+OPERATEURS_SQL = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "ilike": "like"}
+
+SQL_UPSERT_INVENTAIRE = """
+insert into inventaires (pseudo, plante, quantite) values (?, ?, ?)
+on conflict (pseudo, plante) do update set quantite = quantite + excluded.quantite
+"""
+SQL_INVENTAIRES_JOUEURS = """
+select j.pseudo, i.plante, i.quantite, count(i.plante) over (partition by j.pseudo) as nb_plantes
+from joueurs j left join inventaires i on i.pseudo = j.pseudo
+where j.role = 'joueur'
+order by j.pseudo, i.plante
+"""
+
+
+class SqliteStockage(Stockage):
+    nom = "sqlite"
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._verrou = threading.RLock()
+        self._conn = sqlite3.connect(chemin, isolation_level=None, cached_statements=256, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute("pragma synchronous = normal")
+        self._conn.execute("pragma busy_timeout = 5000")
+        self._conn.executescript(SCHEMA_SQLITE)
+
+    @contextmanager
+    def transaction(self):
+        # begin immediate : le verrou d'écriture est pris d'emblée, pas de conflit en cours de route
+        with self._verrou:
+            self._conn.execute("begin immediate")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+            self._conn.execute("commit")
+
+    def _lire(self, sql, parametres=()):
+        with self._verrou:
+            return [dict(r) for r in self._conn.execute(sql, parametres)]
+
+    def enregistrer_joueur(self, pseudo, role, mdp_hash):
+        with self.transaction() as conn:
+            conn.execute(
+                "insert into joueurs (pseudo, role, password_hash) values (?, ?, ?) "
+                "on conflict (pseudo) do update set role = excluded.role, password_hash = excluded.password_hash",
+                (pseudo, role, mdp_hash),
+            )
+
+    def role_joueur(self, pseudo, mdp_hash):
+        lignes = self._lire("select role from joueurs where pseudo = ? and password_hash = ?", (pseudo, mdp_hash))
+        return lignes[0]["role"] if lignes else None
+
+    def changer_mot_de_passe(self, pseudo, mdp_hash):
+        with self.transaction() as conn:
+            conn.execute("update joueurs set password_hash = ? where pseudo = ?", (mdp_hash, pseudo))
+
+    def joueurs(self):
+        return [r["pseudo"] for r in self._lire("select pseudo from joueurs where role = 'joueur'")]
+
+    def supprimer_joueur(self, pseudo):
+        with self.transaction() as conn:
+            for table in ["inventaires", "journal_usages", "historique_distributions", "joueurs"]:
+                conn.execute(f"delete from {table} where pseudo = ?", (pseudo,))
+
+    def inventaire(self, pseudo):
+        lignes = self._lire("select plante, quantite from inventaires where pseudo = ?", (pseudo,))
+        return {r["plante"]: r["quantite"] for r in lignes}
+
+    def inventaires_joueurs(self):
+        inventaires = {}
+        for r in self._lire(SQL_INVENTAIRES_JOUEURS):
+            entree = inventaires.setdefault(r["pseudo"], {"inventaire": {}, "nb_plantes": r["nb_plantes"]})
+            if r["plante"] is not None:
+                entree["inventaire"][r["plante"]] = r["quantite"]
+        return inventaires
+
+    def appliquer_mouvements(self, mouvements):
+        # même logique que la fonction SQL appliquer_mouvements, dans une transaction
+        resultats, journal, distributions = [], [], []
+        with self.transaction() as conn:
+            for m in mouvements:
+                # pas de "returning" : SQLite < 3.35 (image python:3.11-bullseye) ; relu dans la même transaction
+                conn.execute(SQL_UPSERT_INVENTAIRE, (m["pseudo"], m["plante"], m["delta"]))
+                quantite = conn.execute("select quantite from inventaires where pseudo = ? and plante = ?",
+                                        (m["pseudo"], m["plante"])).fetchone()[0]
+                if quantite <= 0:
+                    conn.execute("delete from inventaires where pseudo = ? and plante = ?", (m["pseudo"], m["plante"]))
+                    quantite = 0
+                if "effet" in m:
+                    journal.append({"date": m["date"], "pseudo": m["pseudo"], "plante": m["plante"],
+                                    "quantite": abs(m["delta"]), "effet": m["effet"]})
+                if m.get("distribution"):
+                    distributions.append({"date": m["date"], "pseudo": m["pseudo"], "plante": m["plante"],
+                                          "quantite": m["delta"]})
+                resultats.append({"pseudo": m["pseudo"], "plante": m["plante"], "quantite": quantite})
+            self._inserer(conn, "journal_usages", journal)
+            self._inserer(conn, "historique_distributions", distributions)
+        return resultats
+
+    def _inserer(self, conn, table, lignes, conflit=""):
+        if not lignes:
+            return
+        colonnes = TABLES[table]
+        conn.executemany(
+            f"insert into {table} ({', '.join(colonnes)}) values ({', '.join('?' * len(colonnes))}) {conflit}",
+            [tuple(l.get(c) for c in colonnes) for l in lignes],
+        )
+
+    def inserer(self, table, lignes):
+        with self.transaction() as conn:
+            self._inserer(conn, table, lignes)
+
+    def _where(self, filtres):
+        clauses, parametres = [], []
+        for colonne, operateur, valeur in filtres:
+            if colonne not in {c for cols in TABLES.values() for c in cols}:
+                raise ValueError(f"colonne inconnue : {colonne}")
+            if colonne == "date":
+                valeur = valeur.replace(" ", "T")  # dates stockées en ISO 8601 ("...T...")
+            clauses.append(f"{colonne} {OPERATEURS_SQL[operateur]} ?")
+            parametres.append(valeur)
+        return clauses, parametres
+
+    def lire_page(self, table, colonnes, filtres=(), curseur=None, taille=50):
+        if table not in TABLES or not set(colonnes.split(", ")) <= set(TABLES[table]):
+            raise ValueError(f"lecture invalide : {table} ({colonnes})")
+        clauses, parametres = self._where(filtres)
+        decalage = 0
+        if curseur is not None:
+            clauses.append("date <= ?")
+            parametres.append(curseur[0])
+            decalage = curseur[1]
+        ordre = ", ".join(["date desc"] + colonnes.split(", ")[1:])
+        where = f" where {' and '.join(clauses)}" if clauses else ""
+        lignes = self._lire(
+            f"select {colonnes} from {table}{where} order by {ordre} limit ? offset ?",
+            (*parametres, taille, decalage),
+        )
+        return lignes, curseur_suivant(lignes, curseur, taille)
+
+    def lignes(self, table, filtres=()):
+        clauses, parametres = self._where(filtres)
+        where = f" where {' and '.join(clauses)}" if clauses else ""
+        sql = f"select {', '.join(TABLES[table])} from {table}{where} order by rowid limit ? offset ?"
+        # par pages : le verrou n'est pas gardé entre deux lignes rendues au consommateur
+        decalage = 0
+        while True:
+            page = self._lire(sql, (*parametres, TAILLE_PAGE, decalage))
+            yield from page
+            if len(page) < TAILLE_PAGE:
+                return
+            decalage += TAILLE_PAGE
+
+    def upserter(self, table, lignes):
+        mises_a_jour = ", ".join(f"{c} = excluded.{c}" for c in TABLES[table] if c not in CLES[table])
+        with self.transaction() as conn:
+            self._inserer(conn, table, lignes, f"on conflict ({', '.join(CLES[table])}) do update set {mises_a_jour}")
+
+    def supprimer(self, table, filtres):
+        clauses, parametres = self._where(filtres)
+        with self.transaction() as conn:
+            conn.execute(f"delete from {table} where {' and '.join(clauses)}", parametres)
+
+    def vider(self, table):
+        with self.transaction() as conn:
+            conn.execute(f"delete from {table}")
+
+
+# ==========================
+# SYNCHRONISATION / EXPORT
+# ==========================
+def _cle_ligne(table, ligne):
+    # même ligne quel que soit le moteur : Supabase renvoie "...+00:00", SQLite la chaîne écrite
+    valeurs = [ligne.get(c) for c in TABLES[table]]
+    if table in HISTORIQUES and valeurs[0] is not None:
+        date = datetime.fromisoformat(str(valeurs[0]).replace(" ", "T"))
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        valeurs[0] = date.astimezone(timezone.utc)
+    return tuple(valeurs)
+
+
+def copier(source, cible, tables=tuple(TABLES), remplacer=False, taille_lot=TAILLE_PAGE):
+    # joueurs et inventaires : upsert, puis suppression dans la cible des clés absentes de la source
+    # (joueur supprimé avec ses données, plante sortie d'un inventaire) ;
+    # historiques : ajout des lignes de la source absentes de la cible, comparées ligne entière
+    # (multi-ensemble : deux lignes identiques de la source donnent deux lignes dans la cible)
+    copiees, supprimees = {}, {}
+    for table in tables:
+        if remplacer:
+            cible.vider(table)
+        deja_presentes = Counter()
+        if table in HISTORIQUES and not remplacer:
+            deja_presentes.update(_cle_ligne(table, l) for l in cible.lignes(table))
+        ecrire = cible.upserter if table in CLES else cible.inserer
+        cles_source = set()
+        lot, n = [], 0
+        for ligne in source.lignes(table):
+            if table in CLES:
+                cles_source.add(tuple(ligne[c] for c in CLES[table]))
+            else:
+                cle = _cle_ligne(table, ligne)
+                if deja_presentes[cle]:
+                    deja_presentes[cle] -= 1
+                    continue
+            lot.append(ligne)
+            if len(lot) >= taille_lot:
+                ecrire(table, lot)
+                n += len(lot)
+                lot = []
+        if lot:
+            ecrire(table, lot)
+            n += len(lot)
+        copiees[table] = n
+
+        if table in CLES and not remplacer:
+            obsoletes = {tuple(l[c] for c in CLES[table]) for l in cible.lignes(table)} - cles_source
+            for cle in sorted(obsoletes):
+                if table == "joueurs":
+                    cible.supprimer_joueur(cle[0])
+                else:
+                    cible.supprimer(table, tuple((c, "eq", v) for c, v in zip(CLES[table], cle)))
+            supprimees[table] = len(obsoletes)
+    return copiees, supprimees
+
+
+def exporter(source, dossier, tables=tuple(TABLES)):
+    os.makedirs(dossier, exist_ok=True)
+    for table in tables:
+        with open(os.path.join(dossier, f"{table}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(TABLES[table])
+            for ligne in source.lignes(table):
+                writer.writerow([ligne[c] for c in TABLES[table]])
+
+
+def ouvrir(moteur, sqlite="botanique.db"):
+    if moteur == "sqlite":
+        return SqliteStockage(sqlite)
+    url, cle = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if not (url and cle) and os.path.exists(".streamlit/secrets.toml"):
+        with open(".streamlit/secrets.toml", "rb") as f:
+            secrets = tomllib.load(f)
+        url, cle = secrets.get("SUPABASE_URL"), secrets.get("SUPABASE_KEY")
+    if not (url and cle):
+        raise SystemExit("SUPABASE_URL / SUPABASE_KEY introuvables (variables d'environnement ou .streamlit/secrets.toml)")
+    return SupabaseStockage(client_supabase(url, cle))
+
+
+# ==========================
+# POINT D'ENTRÉE : python -m stockage
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copie et export des données entre moteurs de stockage.")
+    parser.add_argument("--sqlite", default=os.environ.get("BOTANIQUE_SQLITE", "botanique.db"), help="fichier SQLite")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), default=list(TABLES))
+    commandes = parser.add_subparsers(dest="commande", required=True)
+    p_copier = commandes.add_parser("copier", help="copier les données d'un moteur vers l'autre")
+    p_copier.add_argument("source", choices=["supabase", "sqlite"])
+    p_copier.add_argument("cible", choices=["supabase", "sqlite"])
+    p_copier.add_argument("--remplacer", action="store_true", help="vider les tables cibles avant la copie")
+    p_exporter = commandes.add_parser("exporter", help="exporter chaque table en CSV")
+    p_exporter.add_argument("source", choices=["supabase", "sqlite"])
+    p_exporter.add_argument("dossier")
+    args = parser.parse_args(argv)
+
+    if args.commande == "copier":
+        if args.source == args.cible:
+            parser.error("source et cible identiques")
+        copiees, supprimees = copier(ouvrir(args.source, args.sqlite), ouvrir(args.cible, args.sqlite),
+                                     args.tables, args.remplacer)
+        for table, n in copiees.items():
+            suppression = f", {supprimees[table]} supprimée(s)" if table in supprimees else ""
+            print(f"{table} : {n} ligne(s) copiée(s){suppression}")
+    else:
+        exporter(ouvrir(args.source, args.sqlite), args.dossier, args.tables)
+        print(f"{len(args.tables)} table(s) exportée(s) dans {args.dossier}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,117 @@
 import streamlit as st
 import pandas as pd
-import random
 import hashlib
-from datetime import datetime
-from streamlit_autorefresh import st_autorefresh
-from supabase import create_client, Client
+import csv
+import tempfile
+import atexit
+import os
+from datetime import datetime, timedelta, timezone
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from stockage import Stockage, SupabaseStockage, SqliteStockage, client_supabase
+from cache_lecture import CacheLecture
+from requetes import ExecuteurRequetes
+from changements import FluxChangements, INVENTAIRE, JOURNAL
+from tampon_historique import TamponHistorique, horodatage
+from traces import Traceur
+from catalogue import (
+    Catalogue, IndexRecherche, RequeteTirage, TiragesFiltres, CATEGORIES, CATEGORIE_DEFAUT, PONDERATIONS,
+    charger_table, tirer_lot, tirer_expedition,
+)
 
 # ==========================
 # CONFIGURATION
 # ==========================
 ADMIN_USER = "admin"
 ADMIN_HASH = "3a5763614660da0211b90045a806e2105a528a06a4dc9694299484092dd74d3e"  # SHA256 mot de passe admin
+RAFRAICHISSEMENT_S = 5  # rafraîchissement automatique des fragments inventaire et journal
+SONDAGE_MIN_S = 10   # relecture de secours des vues joueur sans changement signalé...
+SONDAGE_MAX_S = 120  # ...doublée à chaque relecture inchangée, jusqu'à ce plafond
+CACHE_TTL_S = 30      # durée de vie des lectures Supabase en cache
+CACHE_CAPACITE = 2048 # nombre maximal de lectures en cache (LRU)
+TAILLE_PAGE = 1000    # lignes par page pour les lectures en masse (max-rows PostgREST)
+TAILLE_PAGE_HISTORIQUE = 50  # lignes par page affichées dans le journal et l'historique
+HISTORIQUE_SECOURS = ".historique_en_attente.jsonl"  # événements non écrits (Supabase injoignable)
+HISTORIQUE_SEUIL = 50         # vidage du tampon d'historique dès N événements en attente...
+HISTORIQUE_INTERVALLE_S = 2.0 # ...ou toutes les N secondes
+TRACES_ACTIVES = True         # mesures des appels backend et des sections d'interface
+TRACES_JOURNAL = None         # ex. "traces.jsonl" : une ligne JSON par rerun
+REQUETES_PARALLELES = 8     # requêtes Supabase simultanées (threads et connexions HTTP)
+REQUETE_TIMEOUT_S = 10.0    # délai maximal d'une requête Supabase
+TABLES_FILTREES_OCTETS = 8 << 20  # mémoire max des tables de tirage filtré compilées (LRU)
+STOCKAGE = os.environ.get("BOTANIQUE_STOCKAGE", "supabase")  # "supabase" ou "sqlite" (local, hors ligne)
+SQLITE_CHEMIN = os.environ.get("BOTANIQUE_SQLITE", "botanique.db")
+FUSEAU_AFFICHAGE = None  # fuseau des dates affichées et exportées (None : heure locale du serveur)
 
 # ==========================
-# SUPABASE CLIENT
+# STOCKAGE
 # ==========================
+# Requêtes indépendantes d'un même rerun lancées ensemble sur le pool de connexions
 @st.cache_resource
-def get_supabase() -> Client:
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+def get_requetes() -> ExecuteurRequetes:
+    requetes = ExecuteurRequetes(REQUETES_PARALLELES, REQUETE_TIMEOUT_S)
+    atexit.register(requetes.arreter)
+    return requetes
 
-supabase = get_supabase()
+requetes = get_requetes()
+
+# Moteur choisi par STOCKAGE ; toutes les lectures/écritures passent par lui (cf. stockage.py)
+@st.cache_resource
+def get_stockage() -> Stockage:
+    if STOCKAGE == "sqlite":
+        return SqliteStockage(SQLITE_CHEMIN)
+    client = client_supabase(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], REQUETE_TIMEOUT_S, REQUETES_PARALLELES)
+    return SupabaseStockage(client, requetes, TAILLE_PAGE)
+
+stockage = get_stockage()
+
+# Mesures partagées par le processus (onglet admin "Diagnostics")
+@st.cache_resource
+def get_traceur() -> Traceur:
+    return Traceur(TRACES_ACTIVES, TRACES_JOURNAL)
+
+traceur = get_traceur()
+debut_rerun = traceur.debut_rerun()
+
+def span_fragment(nom):
+    # Un rerun limité à un fragment (run_every, widget du fragment) n'exécute pas le module :
+    # le span du fragment le compte alors comme un rerun de la session
+    ctx = get_script_run_ctx()
+    return traceur.span(nom, ctx.session_id if ctx is not None and ctx.fragment_ids_this_run else None)
+
+def relancer_fragment():
+    # st.rerun(scope="fragment") n'est accepté que pendant un rerun limité au fragment ;
+    # un clic vu par un rerun complet (AppTest, rerun concurrent) relance toute l'application
+    ctx = get_script_run_ctx()
+    st.rerun(scope="fragment" if ctx is not None and ctx.fragment_ids_this_run else "app")
+
+# Versions par joueur partagées entre sessions : les vues joueur ne relisent que sur changement
+@st.cache_resource
+def get_flux() -> FluxChangements:
+    return FluxChangements(SONDAGE_MIN_S, SONDAGE_MAX_S)
+
+flux = get_flux()
+
+# Cache des lectures partagé par le processus ; chaque écriture invalide ses propres clés
+@st.cache_resource
+def get_cache() -> CacheLecture:
+    return CacheLecture(CACHE_CAPACITE, CACHE_TTL_S)
+
+cache = get_cache()
+
+def historique_ecrit(table, lignes):
+    # Appelé par le tampon après chaque INSERT multi-lignes réussi (historique_tirages uniquement)
+    cache.invalider("get_historique", table)
+
+# Écritures d'historique groupées, vidées par un thread de fond (réveillé en fin d'action)
+@st.cache_resource
+def get_tampon() -> TamponHistorique:
+    tampon = TamponHistorique(stockage, HISTORIQUE_SECOURS, HISTORIQUE_SEUIL, HISTORIQUE_INTERVALLE_S,
+                              apres_ecriture=historique_ecrit)
+    tampon.vider = traceur.instrumenter(tampon.vider)
+    tampon.demarrer()
+    return tampon
+
+tampon = get_tampon()
 
 # ==========================
 # STYLE
@@ -45,149 +135,276 @@ st.markdown("""
 # ==========================
 # SESSION INIT
 # ==========================
-for key in ["joueur", "role", "last_tirage"]:
+for key in ["joueur", "role", "last_tirage", "last_expedition"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
 # ==========================
-# SUPABASE UTILS
+# STOCKAGE UTILS
 # ==========================
+@traceur.instrumenter
 def ajouter_joueur(pseudo, role="joueur", mdp_hash=""):
-    supabase.table("joueurs").upsert({
-        "pseudo": pseudo, "role": role, "password_hash": mdp_hash
-    }).execute()
+    stockage.enregistrer_joueur(pseudo, role, mdp_hash)
+    cache.invalider("get_joueurs")
+    cache.invalider("get_inventaires_joueurs")
+    cache.invalider("verifier_login", pseudo)
 
+@cache.memoiser
+@traceur.instrumenter
 def verifier_login(pseudo, mdp_hash):
-    res = supabase.table("joueurs").select("role").eq("pseudo", pseudo).eq("password_hash", mdp_hash).execute()
-    if res.data:
-        return res.data[0]["role"]
-    return None
+    return stockage.role_joueur(pseudo, mdp_hash)
 
+@cache.memoiser
+@traceur.instrumenter
 def get_inventaire(pseudo):
-    res = supabase.table("inventaires").select("plante, quantite").eq("pseudo", pseudo).execute()
-    return {row["plante"]: row["quantite"] for row in res.data}
-
-def ajouter_au_inventaire(pseudo, plante, quantite):
-    res = supabase.table("inventaires").select("quantite").eq("pseudo", pseudo).eq("plante", plante).execute()
-    if res.data:
-        nouvelle_qt = res.data[0]["quantite"] + quantite
-        supabase.table("inventaires").update({"quantite": nouvelle_qt}).eq("pseudo", pseudo).eq("plante", plante).execute()
-    else:
-        supabase.table("inventaires").insert({"pseudo": pseudo, "plante": plante, "quantite": quantite}).execute()
-
-def retirer_de_inventaire(pseudo, plante, quantite):
-    res = supabase.table("inventaires").select("quantite").eq("pseudo", pseudo).eq("plante", plante).execute()
-    if res.data:
-        nouvelle_qt = res.data[0]["quantite"] - quantite
-        if nouvelle_qt <= 0:
-            supabase.table("inventaires").delete().eq("pseudo", pseudo).eq("plante", plante).execute()
-        else:
-            supabase.table("inventaires").update({"quantite": nouvelle_qt}).eq("pseudo", pseudo).eq("plante", plante).execute()
-
-def ajouter_journal(pseudo, plante, quantite, effet):
-    supabase.table("journal_usages").insert({
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "pseudo": pseudo,
-        "plante": plante,
-        "quantite": quantite,
-        "effet": effet
-    }).execute()
-
+    return stockage.inventaire(pseudo)
+
+@traceur.instrumenter
+def appliquer_mouvements(mouvements):
+    # Une seule transaction (fonction SQL sql/001_inventaire_atomique.sql ou transaction SQLite) :
+    # mouvements = [{"pseudo", "plante", "delta", "effet"?, "distribution"?}, ...]
+    date = horodatage()
+    resultats = stockage.appliquer_mouvements([{"date": date, **m} for m in mouvements])
+    cache.invalider("get_inventaires_joueurs")
+    if any(m.get("distribution") for m in mouvements):
+        cache.invalider("get_historique", "historique_distributions")
+    for m in mouvements:
+        cache.invalider("get_inventaire", m["pseudo"])
+        if "effet" in m:
+            cache.invalider("get_journal", m["pseudo"])
+        flux.signaler(m["pseudo"], INVENTAIRE, *([JOURNAL] if "effet" in m else []))
+    return resultats
+
+def ajouter_au_inventaire(pseudo, plante, quantite, distribution=False):
+    mouvement = {"pseudo": pseudo, "plante": plante, "delta": quantite}
+    if distribution:
+        mouvement["distribution"] = True
+    return appliquer_mouvements([mouvement])
+
+def retirer_de_inventaire(pseudo, plante, quantite, effet=None):
+    mouvement = {"pseudo": pseudo, "plante": plante, "delta": -quantite}
+    if effet is not None:
+        mouvement["effet"] = effet
+    return appliquer_mouvements([mouvement])
+
+def distribuer_en_masse(attributions):
+    # attributions : [(pseudo, plante, quantite)] ; une seule transaction, historique compris.
+    # Retourne le résultat de chaque ligne (nouveau total ou erreur).
+    mouvements = [{"pseudo": p, "plante": pl, "delta": q, "distribution": True} for p, pl, q in attributions if q > 0]
+    if not mouvements:
+        return []
+    try:
+        totaux = [r["quantite"] for r in appliquer_mouvements(mouvements)]
+        statuts = ["✅"] * len(mouvements)
+    except Exception as e:
+        totaux = [None] * len(mouvements)
+        statuts = [f"❌ {e}"] * len(mouvements)
+    return [
+        {"Joueur": m["pseudo"], "Plante": m["plante"], "Quantité": m["delta"], "Total": total, "Statut": statut}
+        for m, total, statut in zip(mouvements, totaux, statuts)
+    ]
+
+# Journal et distributions sont écrits par appliquer_mouvements ; seuls les tirages passent
+# par le tampon : appeler tampon.reveiller() en fin d'action
 def ajouter_historique_tirage(env, plante):
-    supabase.table("historique_tirages").insert({
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    tampon.ajouter("historique_tirages", {
+        "date": horodatage(),
         "env": env,
         "plante": plante
-    }).execute()
-
-def ajouter_historique_distribution(pseudo, plante, quantite):
-    supabase.table("historique_distributions").insert({
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "pseudo": pseudo,
-        "plante": plante,
-        "quantite": quantite
-    }).execute()
-
-def get_journal(pseudo):
-    res = supabase.table("journal_usages").select("date, plante, quantite, effet").eq("pseudo", pseudo).order("date", desc=True).execute()
-    return [{"Date": r["date"], "Plante": r["plante"], "Quantité": r["quantite"], "Effet": r["effet"]} for r in res.data]
-
-def get_historique_tirages():
-    res = supabase.table("historique_tirages").select("date, env, plante").order("date", desc=True).execute()
-    return [(r["date"], r["env"], r["plante"]) for r in res.data]
-
+    })
+
+def date_affichee(valeur):
+    # Horodatage stocké (ISO 8601, UTC) -> "AAAA-MM-JJ HH:MM:SS" à l'heure locale
+    date = datetime.fromisoformat(str(valeur).replace(" ", "T"))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(FUSEAU_AFFICHAGE).strftime("%Y-%m-%d %H:%M:%S")
+
+def filtres_historique(env=None, pseudo=None, plante=None, du=None, au=None):
+    # Filtres serveur sous forme de tuple hashable (clé de cache) : ((colonne, opérateur, valeur), ...)
+    filtres = []
+    if env:
+        filtres.append(("env", "eq", env))
+    if pseudo:
+        filtres.append(("pseudo", "eq", pseudo))
+    if plante:
+        filtres.append(("plante", "ilike", f"%{plante}%"))
+    if du:
+        filtres.append(("date", "gte", f"{du:%Y-%m-%d}"))
+    if au:
+        # borne exclusive au lendemain : les dates ont des microsecondes (horodatage())
+        filtres.append(("date", "lt", f"{au + timedelta(days=1):%Y-%m-%d}"))
+    return tuple(filtres)
+
+def lire_page(table, colonnes, filtres=(), curseur=None, taille=TAILLE_PAGE_HISTORIQUE):
+    # Pagination par curseur sur "date", du plus récent au plus ancien (cf. stockage.curseur_suivant)
+    return stockage.lire_page(table, colonnes, filtres, curseur, taille)
+
+def iterer_lignes(table, colonnes, filtres=(), taille=TAILLE_PAGE):
+    # Parcours paresseux de toute la table, une page en mémoire à la fois
+    curseur = None
+    while True:
+        lignes, curseur = lire_page(table, colonnes, filtres, curseur, taille)
+        yield from lignes
+        if curseur is None:
+            return
+
+def exporter_csv(table, colonnes, filtres=()):
+    # Écrit l'export page par page ; le fichier bascule sur disque au-delà de 1 Mo
+    fichier = tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+", newline="", encoding="utf-8")
+    noms = colonnes.split(", ")
+    writer = csv.writer(fichier)
+    writer.writerow(noms)
+    for ligne in iterer_lignes(table, colonnes, filtres):
+        writer.writerow([date_affichee(ligne[c]) if c == "date" else ligne[c] for c in noms])
+    fichier.seek(0)
+    return fichier
+
+@cache.memoiser
+@traceur.instrumenter
+def get_historique(table, colonnes, filtres=(), curseur=None, taille=TAILLE_PAGE_HISTORIQUE):
+    return lire_page(table, colonnes, filtres, curseur, taille)
+
+@cache.memoiser
+@traceur.instrumenter
+def get_journal(pseudo, curseur=None, taille=TAILLE_PAGE_HISTORIQUE):
+    lignes, suivant = lire_page("journal_usages", "date, plante, quantite, effet", (("pseudo", "eq", pseudo),), curseur, taille)
+    return [{"Date": date_affichee(r["date"]), "Plante": r["plante"], "Quantité": r["quantite"], "Effet": r["effet"]} for r in lignes], suivant
+
+@cache.memoiser
+@traceur.instrumenter
 def get_joueurs():
-    res = supabase.table("joueurs").select("pseudo").eq("role", "joueur").execute()
-    return [r["pseudo"] for r in res.data]
+    return stockage.joueurs()
 
-def supprimer_joueur(pseudo):
-    supabase.table("inventaires").delete().eq("pseudo", pseudo).execute()
-    supabase.table("journal_usages").delete().eq("pseudo", pseudo).execute()
-    supabase.table("historique_distributions").delete().eq("pseudo", pseudo).execute()
-    supabase.table("joueurs").delete().eq("pseudo", pseudo).execute()
+@cache.memoiser
+@traceur.instrumenter
+def get_inventaires_joueurs():
+    # Tous les inventaires en une requête : {pseudo: {"inventaire": {plante: quantite}, "nb_plantes": n}}
+    return stockage.inventaires_joueurs()
 
+@traceur.instrumenter
+def supprimer_joueur(pseudo):
+    stockage.supprimer_joueur(pseudo)
+    for cle in [("get_inventaire", pseudo), ("get_journal", pseudo), ("get_joueurs",),
+                ("get_inventaires_joueurs",), ("verifier_login", pseudo)]:
+        cache.invalider(*cle)
+    flux.signaler(pseudo, INVENTAIRE, JOURNAL)
+
+def lecture_suivie(sujet, pseudo, lecture):
+    # Relit via le flux de changements ; l'état (version, échéance, données) vit dans la session
+    cle = f"suivi_{sujet}"
+    etat = st.session_state.get(cle)
+    if etat is not None and etat.get("pseudo") != pseudo:
+        etat = None
+    etat = flux.relire(etat, pseudo, sujet, lambda: lecture(pseudo))
+    st.session_state[cle] = {**etat, "pseudo": pseudo}
+    return etat["donnees"]
+
+def pagination(cle, lecture, taille=TAILLE_PAGE_HISTORIQUE, filtres=()):
+    # Pile des curseurs de page en session ; repart de la première page si les filtres changent.
+    # Appelée depuis un fragment : changer de page ne relance que ce fragment
+    etat = st.session_state.get(f"pages_{cle}")
+    if etat is None or etat["filtres"] != (filtres, taille):
+        etat = {"filtres": (filtres, taille), "pile": [None]}
+        st.session_state[f"pages_{cle}"] = etat
+    pile = etat["pile"]
+    lignes, suivant = lecture(pile[-1], taille)
+    c1, c2, c3 = st.columns([1, 1, 3])
+    if c1.button("◀ Précédent", key=f"prec_{cle}", disabled=len(pile) == 1):
+        pile.pop()
+        relancer_fragment()
+    if c2.button("Suivant ▶", key=f"suiv_{cle}", disabled=suivant is None):
+        pile.append(suivant)
+        relancer_fragment()
+    c3.caption(f"Page {len(pile)}")
+    return lignes
+
+@traceur.instrumenter
 def changer_mot_de_passe(pseudo, nouveau_hash):
-    supabase.table("joueurs").update({"password_hash": nouveau_hash}).eq("pseudo", pseudo).execute()
+    stockage.changer_mot_de_passe(pseudo, nouveau_hash)
+    cache.invalider("verifier_login", pseudo)
 
 # ==========================
 # LOAD CSV
 # ==========================
-@st.cache_data
-def charger_fichier(nom):
-    try:
-        df = pd.read_csv(nom, sep=";", encoding="cp1252", low_memory=False)
-    except:
-        return {"table": [], "df": pd.DataFrame(), "lookup": {}}
-
-    df = df.iloc[:, :8].copy()
-    df.columns = ["Nom", "Usage", "Habitat", "Informations", "Rarete", "Debut", "Fin", "Proliferation"]
-
-    # Remplacement des ?? par '
-    df = df.apply(lambda col: col.str.replace("??", "'", regex=False) if col.dtype == "object" else col)
-
-    df["Debut"] = pd.to_numeric(df["Debut"], errors="coerce").fillna(0).astype(int)
-    df["Fin"] = pd.to_numeric(df["Fin"], errors="coerce").fillna(1000).astype(int)
-    df["Rarete"] = pd.to_numeric(df["Rarete"], errors="coerce").fillna(0)
-
-    max_val = int(df["Fin"].max())
-    table = [None] * (max_val + 1)
-    for _, row in df.iterrows():
-        for i in range(row["Debut"], row["Fin"] + 1):
-            table[i] = row
-    lookup = {row["Nom"]: row for _, row in df.iterrows()}
-    return {"table": table, "df": df, "lookup": lookup}
-
-fichiers = {
-    "Collines": charger_fichier("Collines.csv"),
-    "Forêts": charger_fichier("Forets.csv"),
-    "Plaines": charger_fichier("Plaines.csv"),
-    "Montagnes": charger_fichier("Montagnes.csv"),
-    "Marais": charger_fichier("Marais.csv"),
-    "Sous-sols": charger_fichier("Sous-sols.csv"),
+# Tables compilées (cases -> indice de ligne) et mises en cache sur disque, cf. catalogue.py.
+# cache_resource : objets partagés en lecture seule, sans re-sérialisation à chaque rerun.
+FICHIERS = {
+    "Collines": "Collines.csv",
+    "Forêts": "Forets.csv",
+    "Plaines": "Plaines.csv",
+    "Montagnes": "Montagnes.csv",
+    "Marais": "Marais.csv",
+    "Sous-sols": "Sous-sols.csv",
 }
 
+@st.cache_resource
+def charger_fichier(nom):
+    return charger_table(nom)
+
+@st.cache_resource
+def charger_fichiers():
+    return {env: charger_fichier(nom) for env, nom in FICHIERS.items()}
+
+with traceur.span("chargement_csv"):
+    fichiers = charger_fichiers()
+
+# Index nom -> fiches (catégorie, icône, effet, étoiles...) partagé par toutes les sessions
+@st.cache_resource
+def charger_catalogue(_fichiers):
+    return Catalogue(_fichiers)
+
+index_plantes = charger_catalogue(fichiers)
+
+# Index plein texte et approché sur toutes les fiches, construit une fois par processus
+@st.cache_resource
+def charger_index_recherche(_catalogue):
+    return IndexRecherche(_catalogue)
+
+index_recherche = charger_index_recherche(index_plantes)
+
+# Tables de tirage par filtre (biomes, catégories, rareté...), compilées à la demande
+@st.cache_resource
+def charger_tirages_filtres(_fichiers, _catalogue):
+    return TiragesFiltres(_fichiers, _catalogue, TABLES_FILTREES_OCTETS)
+
+tirages_filtres = charger_tirages_filtres(fichiers, index_plantes)
+
+# HTML des cartes mémorisé par plante (biome, ligne) pour tout le processus
+@st.cache_resource
+def carte_plante(env, ligne):
+    fiche = index_plantes.par_biome[env][ligne]
+    row_class = "champignon" if fiche.champignon else "herbe"
+    row_type = "🍄 Champignon" if fiche.champignon else "🌱 Herbe"
+    return f"""
+                    <div class="card {row_class}">
+                    <h3>{row_type} {fiche.nom}</h3>
+                    <p><b>Usage :</b> {fiche.usage}</p>
+                    <p><b>Habitat :</b> {fiche.habitat}</p>
+                    <p><b>Rareté :</b> {"⭐" * fiche.etoiles} ({fiche.rarete})</p>
+                    <p><b>Prolifération :</b> {fiche.proliferation}</p>
+                    <p><b>Informations :</b><br>{fiche.informations}</p>
+                    </div>
+                    """
+
 # ==========================
 # TIRAGE
 # ==========================
-def tirer_plantes(data, nb):
-    table = data["table"]
-    if not table:
-        return pd.DataFrame()
-    tirages = []
-    max_val = len(table) - 1
-    while len(tirages) < nb:
-        val = random.randint(1, max_val)
-        plante = table[val]
-        if plante is not None:
-            tirages.append(plante)
-    return pd.DataFrame(tirages)
+def tirer_plantes(data, nb, graine=None):
+    # Tirage vectorisé sur les seules cases valides ; graine : int ou np.random.Generator
+    return tirer_lot(data, nb, graine)
+
+HISTORIQUES = {
+    "Tirages": ("historique_tirages", "date, env, plante", ["Date", "Environnement", "Plante"]),
+    "Distributions": ("historique_distributions", "date, pseudo, plante, quantite", ["Date", "Joueur", "Plante", "Quantité"]),
+}
 
 # ==========================
 # LOGIN
 # ==========================
 st.title("🌿 Mini-Jeu Botanique")
 
-if st.session_state.joueur is None:
+def formulaire_login():
     with st.form("login"):
         pseudo = st.text_input("Pseudo")
         mdp = st.text_input("Mot de passe", type="password")
@@ -215,81 +432,65 @@ if st.session_state.joueur is None:
             st.success("Compte créé ! Vous pouvez maintenant vous connecter.")
 
 # ==========================
-# INTERFACE JOUEUR
+# FRAGMENTS JOUEUR
 # ==========================
-if st.session_state.role == "joueur":
-    st_autorefresh(interval=5000, key="raffraichissement_auto")
-    joueur = st.session_state.joueur
-    inventaire = get_inventaire(joueur)
-
-    tabs_joueur = st.tabs(["📦 Inventaire", "📜 Journal", "🔑 Mon compte"])
-
-    with tabs_joueur[0]:
+# Chaque onglet est un fragment : ses widgets ne relancent que lui, et l'inventaire et le journal
+# se rafraîchissent seuls toutes les RAFRAICHISSEMENT_S secondes (remplace st_autorefresh).
+@st.fragment(run_every=RAFRAICHISSEMENT_S)
+def fragment_inventaire(joueur):
+    with span_fragment("joueur.inventaire"):
         st.subheader("📦 Mon Inventaire")
+        inventaire = lecture_suivie(INVENTAIRE, joueur, get_inventaire)
         if inventaire:
             data_inv = []
             for plante, qt in inventaire.items():
-                type_plante = "Inconnu"
-                for data in fichiers.values():
-                    if plante in data["lookup"]:
-                        type_plante = data["lookup"][plante]["Usage"]
-                        break
-                usage_lower = type_plante.lower()
-                if any(m in usage_lower for m in ["soin", "médic", "guér", "curatif"]): icone = "❤️"
-                elif any(m in usage_lower for m in ["tox", "poison"]): icone = "☠️"
-                elif "aliment" in usage_lower: icone = "🍽️"
-                elif "arom" in usage_lower: icone = "🌿"
-                elif "mag" in usage_lower: icone = "✨"
-                elif "bois" in usage_lower or "résine" in usage_lower: icone = "🪵"
-                else: icone = "🌱"
+                fiche = index_plantes.fiche(plante)
+                type_plante = fiche.usage if fiche else "Inconnu"
+                icone = fiche.icone if fiche else CATEGORIE_DEFAUT[1]
                 data_inv.append({"Plante": f"{icone} {plante}", "Type": type_plante, "Quantité": qt})
             st.dataframe(pd.DataFrame(data_inv), use_container_width=True, hide_index=True)
 
             st.divider()
             st.subheader("🌿 Utiliser une plante")
             plante_select = st.selectbox("Choisir une plante", list(inventaire.keys()))
-            plante_info = None
-            for data in fichiers.values():
-                if plante_select in data["lookup"]:
-                    plante_info = data["lookup"][plante_select]
-                    break
+            plante_info = index_plantes.fiche(plante_select)
             if plante_info is not None:
                 st.markdown(f"""
-**Usage :** {plante_info['Usage']}  
-**Habitat :** {plante_info['Habitat']}  
-**Rareté :** {plante_info['Rarete']}  
-**Prolifération :** {plante_info['Proliferation']}  
-**Informations :** {plante_info['Informations']}
+**Usage :** {plante_info.usage}  
+**Habitat :** {plante_info.habitat}  
+**Rareté :** {plante_info.rarete}  
+**Prolifération :** {plante_info.proliferation}  
+**Informations :** {plante_info.informations}
 """)
             max_qt = inventaire[plante_select]
             quantite_utilisee = st.number_input("Quantité à utiliser", min_value=1, max_value=max_qt, value=1)
             if st.button("Utiliser"):
-                usage = plante_info["Usage"].lower()
-                if any(m in usage for m in ["soin", "médic", "guér", "curatif"]): message = f"❤️ {plante_select} utilisée pour ses vertus médicinales."
-                elif any(m in usage for m in ["tox", "poison"]): message = f"☠️ {plante_select} manipulée avec prudence (toxique)."
-                elif "aliment" in usage: message = f"🍽️ {plante_select} consommée."
-                elif "arom" in usage: message = f"🌿 {plante_select} utilisée pour son arôme."
-                elif "mag" in usage: message = f"✨ {plante_select} intégrée à un rituel."
-                elif "bois" in usage or "résine" in usage: message = f"🪵 {plante_select} transformée pour un usage matériel."
-                else: message = f"🌱 {plante_select} utilisée."
+                message = index_plantes.message_effet(plante_select)
                 st.info(message)
-                retirer_de_inventaire(joueur, plante_select, quantite_utilisee)
-                ajouter_journal(joueur, plante_select, quantite_utilisee, message)
+                retirer_de_inventaire(joueur, plante_select, quantite_utilisee, effet=message)
         else:
             st.info("Votre inventaire est vide. L'administrateur peut vous attribuer des plantes.")
 
-    with tabs_joueur[1]:
+@st.fragment(run_every=RAFRAICHISSEMENT_S)
+def fragment_journal(joueur):
+    with span_fragment("joueur.journal"):
         st.subheader("📜 Journal personnel")
-        journal = get_journal(joueur)
+        journal = pagination(
+            "journal",
+            lambda curseur, taille: lecture_suivie(JOURNAL, joueur, get_journal) if curseur is None
+            else get_journal(joueur, curseur, taille)
+        )
         if journal:
             st.dataframe(pd.DataFrame(journal), use_container_width=True, hide_index=True)
         else:
             st.info("Aucune utilisation enregistrée.")
 
-    # ==========================
-    # ONGLET MON COMPTE (JOUEUR)
-    # ==========================
-    with tabs_joueur[2]:
+# ==========================
+# ONGLET MON COMPTE (JOUEUR)
+# ==========================
+@st.fragment
+def fragment_compte(joueur):
+    with span_fragment("joueur.compte"):
         st.subheader("🔑 Changer mon mot de passe")
         ancien_mdp = st.text_input("Ancien mot de passe", type="password", key="ancien_mdp_joueur")
         nouveau_mdp = st.text_input("Nouveau mot de passe", type="password", key="nouveau_mdp_joueur")
@@ -310,17 +511,13 @@ if st.session_state.role == "joueur":
                     st.success("✅ Mot de passe mis à jour avec succès.")
 
 # ==========================
-# INTERFACE ADMIN
+# FRAGMENTS ADMIN
 # ==========================
-elif st.session_state.role == "admin":
-    tab_gestion, tab_attribution, tab_historique, tab_users = st.tabs([
-        "🎮 Gestion",
-        "🌿 Attribution manuelle",
-        "📜 Historique",
-        "👥 Utilisateurs"
-    ])
-
-    with tab_gestion:
+# La liste des joueurs vient du cache de lecture : un fragment relancé seul la relit sans réseau.
+@st.fragment
+def fragment_gestion():
+    with span_fragment("admin.gestion"):
+        joueurs = get_joueurs()
         col_left, col_right = st.columns(2)
 
         with col_left:
@@ -333,104 +530,212 @@ elif st.session_state.role == "admin":
             if c3.button("5"): nb = 5
 
             if nb > 0:
-                tirage = tirer_plantes(fichiers[env], nb)
+                tirage = tirer_plantes(fichiers[env], nb).assign(Environnement=env)
                 st.session_state.last_tirage = tirage
-                for _, row in tirage.iterrows():
-                    ajouter_historique_tirage(env, row["Nom"])
+                st.session_state.resultat_distribution = None
+                for nom in tirage["Nom"]:
+                    ajouter_historique_tirage(env, nom)
+                tampon.reveiller()
+
+            with st.expander("🧭 Expédition (tirage en masse)"):
+                envs_exp = st.multiselect("Environnements", list(fichiers.keys()), key="envs_expedition")
+                nb_exp = st.number_input("Tirages par environnement", 1, 1000, 100, key="nb_expedition")
+                graine_exp = st.text_input("Graine (optionnelle, pour rejouer le tirage)", key="graine_expedition")
+                if st.button("Lancer l'expédition") and envs_exp:
+                    graine_exp = graine_exp.strip()
+                    if graine_exp and not graine_exp.isdecimal():
+                        st.warning("La graine doit être un entier positif ou nul.")
+                    else:
+                        graine = int(graine_exp) if graine_exp else None
+                        expedition = tirer_expedition(fichiers, {e: nb_exp for e in envs_exp}, graine)
+                        st.session_state.last_expedition = expedition
+                        for env_exp, nom in zip(expedition["Environnement"], expedition["Nom"]):
+                            ajouter_historique_tirage(env_exp, nom)
+                        tampon.reveiller()
+                if isinstance(st.session_state.last_expedition, pd.DataFrame) and not st.session_state.last_expedition.empty:
+                    resume = (st.session_state.last_expedition
+                              .groupby(["Environnement", "Nom"]).size()
+                              .reset_index(name="Quantité")
+                              .sort_values("Quantité", ascending=False))
+                    st.dataframe(resume, use_container_width=True, hide_index=True)
+
+            with st.expander("🎯 Tirage filtré"):
+                biomes_f = st.multiselect("Environnements", list(fichiers.keys()), default=[env], key="biomes_filtre")
+                categories_f = st.multiselect(
+                    "Usages", [c[0] for c in CATEGORIES + [CATEGORIE_DEFAUT]],
+                    format_func=lambda c: next(f"{i} {n}" for n, i, _, _ in CATEGORIES + [CATEGORIE_DEFAUT] if n == c),
+                    key="categories_filtre",
+                )
+                type_f = st.radio("Type", ["Tous", "🌱 Herbes", "🍄 Champignons"], horizontal=True, key="type_filtre")
+                rarete_f = st.slider("Rareté", -10, 0, (-10, 0), key="rarete_filtre")
+                habitat_f = st.text_input("Habitat contient", key="habitat_filtre")
+                ponderation_f = st.selectbox(
+                    "Pondération", list(PONDERATIONS), format_func=lambda p: f"{p} — {PONDERATIONS[p]}", key="ponderation_filtre"
+                )
+                requete = RequeteTirage(
+                    biomes_f, categories_f,
+                    champignon={"Tous": None, "🌱 Herbes": False, "🍄 Champignons": True}[type_f],
+                    rarete_min=rarete_f[0], rarete_max=rarete_f[1],
+                    habitat=habitat_f, ponderation=ponderation_f,
+                )
+                table_f = tirages_filtres.table(requete)
+                st.caption(f"{len(table_f)} plante(s) tirable(s) — {len(tirages_filtres)} table(s) en cache, "
+                           f"{tirages_filtres.octets // 1024} Ko")
+                f1, f2, f3 = st.columns(3)
+                nb_f = 0
+                if f1.button("1", key="filtre_1"): nb_f = 1
+                if f2.button("3", key="filtre_3"): nb_f = 3
+                if f3.button("5", key="filtre_5"): nb_f = 5
+                if nb_f > 0 and len(table_f):
+                    tirage = table_f.tirer(nb_f)
+                    st.session_state.last_tirage = tirage
+                    st.session_state.resultat_distribution = None
+                    for env_f, nom in zip(tirage["Environnement"], tirage["Nom"]):
+                        ajouter_historique_tirage(env_f, nom)
+                    tampon.reveiller()
 
             if isinstance(st.session_state.last_tirage, pd.DataFrame) and not st.session_state.last_tirage.empty:
-                for _, row in st.session_state.last_tirage.iterrows():
-                    type_lower = row["Usage"].lower()
-                    row_class = "champignon" if "champignon" in type_lower else "herbe"
-                    row_type = "🍄 Champignon" if "champignon" in type_lower else "🌱 Herbe"
-                    rarete = row["Rarete"]
-                    nb_etoiles = min(max(-int(rarete), 0), 5)
-                    etoiles = "⭐" * nb_etoiles
-                    st.markdown(f"""
-                    <div class="card {row_class}">
-                    <h3>{row_type} {row['Nom']}</h3>
-                    <p><b>Usage :</b> {row['Usage']}</p>
-                    <p><b>Habitat :</b> {row['Habitat']}</p>
-                    <p><b>Rareté :</b> {etoiles} ({rarete})</p>
-                    <p><b>Prolifération :</b> {row['Proliferation']}</p>
-                    <p><b>Informations :</b><br>{row['Informations']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                with traceur.span("admin.cartes"):
+                    for ligne, env_carte in zip(st.session_state.last_tirage.index, st.session_state.last_tirage["Environnement"]):
+                        st.markdown(carte_plante(env_carte, ligne), unsafe_allow_html=True)
 
         with col_right:
             st.subheader("🎁 Distribution")
-            joueurs = get_joueurs()
             if joueurs and isinstance(st.session_state.last_tirage, pd.DataFrame) and not st.session_state.last_tirage.empty:
                 joueur = st.selectbox("Joueur", joueurs)
                 plante = st.selectbox("Plante", st.session_state.last_tirage["Nom"].tolist())
                 qte = st.number_input("Quantité", 1, 10, 1)
                 if st.button("Distribuer"):
-                    ajouter_au_inventaire(joueur, plante, qte)
-                    ajouter_historique_distribution(joueur, plante, qte)
+                    ajouter_au_inventaire(joueur, plante, qte, distribution=True)
                     st.success(f"✅ {qte}x {plante} distribué(s) à {joueur}")
+
+                with st.expander("👥 Distribuer tout le tirage"):
+                    groupe = st.multiselect("Joueurs du groupe", joueurs, key="groupe_distribution")
+                    if groupe:
+                        # Plantes × joueurs ; par défaut chacun reçoit autant d'exemplaires que tirés
+                        occurrences = st.session_state.last_tirage["Nom"].value_counts(sort=False)
+                        matrice = pd.DataFrame({j: occurrences for j in groupe})
+                        matrice = st.data_editor(
+                            matrice,
+                            column_config={j: st.column_config.NumberColumn(j, min_value=0, max_value=99, step=1) for j in groupe},
+                            use_container_width=True,
+                            key="matrice_distribution",
+                        ).fillna(0)  # cellule vidée dans l'éditeur = 0
+                        if st.button("Tout distribuer"):
+                            attributions = [
+                                (j, plante_m, int(matrice.at[plante_m, j]))
+                                for plante_m in matrice.index for j in groupe
+                            ]
+                            st.session_state.resultat_distribution = distribuer_en_masse(attributions)
+                    if st.session_state.get("resultat_distribution"):
+                        st.dataframe(pd.DataFrame(st.session_state.resultat_distribution), use_container_width=True, hide_index=True)
             else:
                 st.info("Aucun tirage ou aucun joueur disponible.")
 
-    with tab_attribution:
+@st.fragment
+def fragment_attribution():
+    with span_fragment("admin.attribution"):
+        joueurs = get_joueurs()
         st.subheader("🌿 Attribution manuelle d'une plante")
         col_left, col_right = st.columns([1, 1])
 
         with col_left:
-            env = st.selectbox("Choisir un environnement", list(fichiers.keys()), key="env_manual")
-            if env:
+            recherche = st.text_input("🔎 Rechercher dans tous les biomes (nom, usage, habitat, informations)", key="recherche_manual", live=True)
+            resultats = index_recherche.rechercher(recherche) if recherche.strip() else []
+            if resultats:
+                plante_info = st.selectbox(
+                    "Résultats", resultats, format_func=lambda f: f"{f.icone} {f.nom} — {f.env}", key="resultat_manual"
+                )
+                env, plante = plante_info.env, plante_info.nom
+            else:
+                if recherche.strip():
+                    st.caption("Aucun résultat.")
+                env = st.selectbox("Choisir un environnement", list(fichiers.keys()), key="env_manual")
                 df_env = fichiers[env]["df"]
                 plante = st.selectbox("Choisir une plante", df_env["Nom"].tolist(), key="plante_manual")
-                joueurs = get_joueurs()
+                plante_info = index_plantes.fiche(plante, env)
+            if env:
                 if joueurs:
                     joueur = st.selectbox("Choisir un joueur", joueurs, key="joueur_manual")
                     qte = st.number_input("Quantité", 1, 20, 1)
                     if st.button("Attribuer la plante"):
-                        ajouter_au_inventaire(joueur, plante, qte)
-                        ajouter_historique_distribution(joueur, plante, qte)
+                        ajouter_au_inventaire(joueur, plante, qte, distribution=True)
                         st.success(f"✅ {qte}x {plante} attribué(s) à {joueur}")
                 else:
                     st.warning("Aucun joueur disponible.")
 
         with col_right:
-            if env and plante:
-                plante_info = df_env[df_env["Nom"] == plante].iloc[0]
-                type_lower = plante_info["Usage"].lower()
-                row_class = "champignon" if "champignon" in type_lower else "herbe"
-                row_type = "🍄 Champignon" if "champignon" in type_lower else "🌱 Herbe"
-                rarete = plante_info["Rarete"]
-                nb_etoiles = min(max(-int(rarete), 0), 5)
-                etoiles = "⭐" * nb_etoiles
-                st.markdown(f"""
-                <div class="card {row_class}">
-                <h3>{row_type} {plante_info['Nom']}</h3>
-                <p><b>Usage :</b> {plante_info['Usage']}</p>
-                <p><b>Habitat :</b> {plante_info['Habitat']}</p>
-                <p><b>Rareté :</b> {etoiles} ({rarete})</p>
-                <p><b>Prolifération :</b> {plante_info['Proliferation']}</p>
-                <p><b>Informations :</b><br>{plante_info['Informations']}</p>
-                </div>
-                """, unsafe_allow_html=True)
-
-    with tab_historique:
-        st.subheader("📜 Historique des tirages")
-        hist = get_historique_tirages()
+            if plante_info is not None:
+                st.markdown(carte_plante(plante_info.env, plante_info.ligne), unsafe_allow_html=True)
+
+@st.fragment
+def fragment_historique():
+    with span_fragment("admin.historique"):
+        joueurs = get_joueurs()
+        st.subheader("📜 Historique")
+        type_hist = st.radio("Type", list(HISTORIQUES.keys()), horizontal=True, key="type_historique")
+        table_hist, colonnes_hist, entetes_hist = HISTORIQUES[type_hist]
+
+        f1, f2, f3, f4, f5 = st.columns(5)
+        if type_hist == "Tirages":
+            env_hist = f1.selectbox("Environnement", ["Tous"] + list(fichiers.keys()), key="env_historique")
+            pseudo_hist = None
+        else:
+            env_hist = None
+            pseudo_hist = f1.selectbox("Joueur", ["Tous"] + joueurs, key="joueur_historique")
+        plante_hist = f2.text_input("Plante contient", key="plante_historique")
+        du_hist = f3.date_input("Du", value=None, key="du_historique")
+        au_hist = f4.date_input("Au", value=None, key="au_historique")
+        taille_hist = f5.selectbox("Lignes par page", [25, 50, 100, 200], index=1, key="taille_historique")
+        filtres = filtres_historique(
+            env=None if env_hist == "Tous" else env_hist,
+            pseudo=None if pseudo_hist == "Tous" else pseudo_hist,
+            plante=plante_hist.strip(),
+            du=du_hist,
+            au=au_hist,
+        )
+
+        hist = pagination(
+            f"historique_{table_hist}",
+            lambda curseur, taille: get_historique(table_hist, colonnes_hist, filtres, curseur, taille),
+            taille_hist,
+            filtres,
+        )
         if hist:
             st.dataframe(
-                pd.DataFrame(hist, columns=["Date", "Environnement", "Plante"]),
+                pd.DataFrame(hist)
+                .assign(date=lambda df: df["date"].map(date_affichee))
+                .rename(columns=dict(zip(colonnes_hist.split(", "), entetes_hist))),
                 use_container_width=True
             )
+            st.download_button(
+                "⬇️ Exporter (CSV)",
+                data=lambda: exporter_csv(table_hist, colonnes_hist, filtres),
+                file_name=f"{table_hist}.csv",
+                mime="text/csv",
+            )
         else:
-            st.info("Aucun tirage enregistré.")
+            st.info("Aucune entrée enregistrée.")
 
-    with tab_users:
+@st.fragment
+def fragment_utilisateurs():
+    with span_fragment("admin.utilisateurs"):
+        joueurs, inventaires = requetes.en_parallele(get_joueurs, get_inventaires_joueurs)
         st.subheader("👥 Gestion des joueurs")
-        joueurs = get_joueurs()
+        st.caption(
+            f"📡 Rafraîchissements joueurs : {flux.stats['sondages']} lecture(s), "
+            f"{flux.stats['sondages_evites']} évitée(s) ({flux.taux_evites():.0%}) · "
+            f"🗄️ Cache : {cache.stats['hits']} hit(s), {cache.stats['misses']} miss, "
+            f"{cache.stats['evictions']} éviction(s), {len(cache)}/{cache.capacite} entrée(s) · "
+            f"⚡ Requêtes parallèles : {requetes.stats}"
+        )
 
         if joueurs:
             st.subheader("📦 Inventaires des joueurs")
             for j in joueurs:
-                inv = get_inventaire(j)
-                with st.expander(f"🧑 {j} — {len(inv)} plante(s)"):
+                entree = inventaires.get(j, {"inventaire": {}, "nb_plantes": 0})
+                inv = entree["inventaire"]
+                with st.expander(f"🧑 {j} — {entree['nb_plantes']} plante(s)"):
                     if inv:
                         st.dataframe(
                             pd.DataFrame([{"Plante": p, "Quantité": q} for p, q in inv.items()]),
@@ -447,7 +752,7 @@ elif st.session_state.role == "admin":
             if st.button("Supprimer ce joueur") and confirm:
                 supprimer_joueur(joueur_suppr)
                 st.success(f"Le joueur '{joueur_suppr}' a été supprimé.")
-                st.rerun()
+                relancer_fragment()
 
             # ==========================
             # RESET MOT DE PASSE (ADMIN)
@@ -469,3 +774,79 @@ elif st.session_state.role == "admin":
 
         else:
             st.info("Aucun joueur enregistré.")
+
+@st.fragment
+def fragment_diagnostics():
+    with span_fragment("admin.diagnostics"):
+        st.subheader("🩺 Diagnostics")
+        if not traceur.actif:
+            st.info("Mesures désactivées (TRACES_ACTIVES = False).")
+        else:
+            mesures = traceur.resume()
+            if mesures:
+                st.dataframe(pd.DataFrame(mesures), use_container_width=True, hide_index=True)
+            st.subheader("Sessions")
+            if traceur.sessions:
+                st.dataframe(
+                    pd.DataFrame([
+                        {"Session": sid[:8], "Reruns": v["reruns"], "Reruns de fragment": v["fragments"],
+                         "Total (ms)": round(v["total_ms"], 1),
+                         "Dernier rerun (ms)": round(v["dernier_ms"], 1)}
+                        for sid, v in list(traceur.sessions.items())
+                    ]),
+                    use_container_width=True, hide_index=True
+                )
+            st.caption(f"📝 Tampon d'historique : {tampon.en_attente()} en attente, {tampon.stats}")
+            d1, d2, d3 = st.columns(3)
+            d1.download_button("⬇️ JSON", data=traceur.exporter_json, file_name="traces.json", mime="application/json")
+            d2.download_button("⬇️ Prometheus", data=traceur.exporter_prometheus, file_name="botanique.prom", mime="text/plain")
+            if d3.button("Réinitialiser les mesures"):
+                traceur.reinitialiser()
+                relancer_fragment()
+
+# ==========================
+# INTERFACE JOUEUR
+# ==========================
+# on_change="rerun" : seul l'onglet ouvert est exécuté (tab.open)
+def interface_joueur(joueur):
+    if not st.session_state.get("journal_precharge"):
+        # premier affichage : le journal se charge en même temps que l'inventaire
+        requetes.soumettre(get_journal, joueur)
+        st.session_state.journal_precharge = True
+    tabs_joueur = st.tabs(["📦 Inventaire", "📜 Journal", "🔑 Mon compte"], key="onglets_joueur", on_change="rerun")
+    for onglet, fragment in zip(tabs_joueur, [fragment_inventaire, fragment_journal, fragment_compte]):
+        with onglet:
+            if onglet.open:
+                fragment(joueur)
+
+# ==========================
+# INTERFACE ADMIN
+# ==========================
+def interface_admin():
+    tabs_admin = st.tabs([
+        "🎮 Gestion",
+        "🌿 Attribution manuelle",
+        "📜 Historique",
+        "👥 Utilisateurs",
+        "🩺 Diagnostics"
+    ], key="onglets_admin", on_change="rerun")
+    fragments_admin = [fragment_gestion, fragment_attribution, fragment_historique, fragment_utilisateurs, fragment_diagnostics]
+    for onglet, fragment in zip(tabs_admin, fragments_admin):
+        with onglet:
+            if onglet.open:
+                fragment()
+
+# ==========================
+# AFFICHAGE ET FIN DU RERUN
+# ==========================
+# finally : st.rerun() interrompt le script par une exception, le rerun est mesuré quand même
+try:
+    if st.session_state.joueur is None:
+        formulaire_login()
+    elif st.session_state.role == "joueur":
+        interface_joueur(st.session_state.joueur)
+    elif st.session_state.role == "admin":
+        interface_admin()
+finally:
+    ctx = get_script_run_ctx()
+    traceur.fin_rerun(ctx.session_id if ctx else "?", debut_rerun)
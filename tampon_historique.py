@@ -0,0 +1,175 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+journal = logging.getLogger(__name__)
+
+
+def horodatage():
+    # Horodatage ISO 8601 avec fuseau, stocké en timestamptz (cf. sql/004_dates_horodatees.sql)
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ==========================
+# TAMPON D'ÉCRITURE DE L'HISTORIQUE
+# ==========================
+# Les tirages (historique_tirages ; journal et distributions sont écrits par appliquer_mouvements)
+# sont accumulés puis écrits en un INSERT multi-lignes par table, toujours depuis un thread de
+# fond : à la fin de chaque action (reveiller(), qui ne bloque pas le rerun), dès que `seuil`
+# événements sont en attente ou toutes les `intervalle` secondes.
+# En cas d'échec après `tentatives` essais, les lignes sont déversées dans `fichier_secours`
+# (JSON lines) et renvoyées au vidage suivant. Les lignes illisibles du fichier de secours
+# (écriture interrompue) sont mises de côté dans `fichier_secours + ".rejets"`.
+class TamponHistorique:
+    def __init__(self, stockage, fichier_secours, seuil=50, intervalle=2.0, tentatives=3, apres_ecriture=None):
+        self.stockage = stockage
+        self.fichier_secours = fichier_secours
+        self.seuil = seuil
+        self.intervalle = intervalle
+        self.tentatives = tentatives
+        self.apres_ecriture = apres_ecriture  # appelé avec (table, lignes) après chaque insert réussi
+        self._verrou = threading.Lock()
+        self._verrou_vidage = threading.Lock()
+        self._attente = []  # [(table, ligne)]
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._thread = None
+        self.stats = {"evenements": 0, "inserts": 0, "echecs": 0, "deverses": 0, "rejets": 0, "erreurs_fond": 0}
+
+    def ajouter(self, table, ligne):
+        with self._verrou:
+            self._attente.append((table, ligne))
+            self.stats["evenements"] += 1
+            plein = len(self._attente) >= self.seuil
+        if plein:
+            self._reveil.set()
+
+    def reveiller(self):
+        # depuis le script Streamlit : les essais et leurs délais restent au thread de fond
+        self._reveil.set()
+
+    def en_attente(self):
+        return len(self._attente)
+
+    def vider(self):
+        with self._verrou_vidage:
+            secours = self._relire_secours()
+            with self._verrou:
+                attente, self._attente = self._attente, []
+
+            par_table = {}
+            for table, ligne in secours + attente:
+                par_table.setdefault(table, []).append(ligne)
+            traitees = set()
+            try:
+                for table, lignes in par_table.items():
+                    if self._inserer(table, lignes):
+                        traitees.add(table)
+                        if self.apres_ecriture is not None:
+                            self.apres_ecriture(table, lignes)
+                    else:
+                        self._deverser(table, lignes)
+                        traitees.add(table)
+            except BaseException:
+                # erreur inattendue : rien de ce qui n'a pas été traité n'est perdu
+                with self._verrou:
+                    self._attente[:0] = [(t, l) for t, l in attente if t not in traitees]
+                if secours:
+                    self._reecrire_en_cours([(t, l) for t, l in secours if t not in traitees])
+                raise
+            # toutes les lignes relues sont désormais écrites ou re-déversées
+            if secours:
+                os.remove(self.fichier_secours + ".en_cours")
+
+    def _inserer(self, table, lignes):
+        for essai in range(self.tentatives):
+            try:
+                self.stockage.inserer(table, lignes)
+                self.stats["inserts"] += 1
+                return True
+            except Exception:
+                self.stats["echecs"] += 1
+                if essai + 1 < self.tentatives:
+                    time.sleep(0.2 * 2 ** essai)
+        return False
+
+    # ==========================
+    # FICHIER DE SECOURS
+    # ==========================
+    def _deverser(self, table, lignes):
+        with open(self.fichier_secours, "a", encoding="utf-8") as f:
+            for ligne in lignes:
+                f.write(json.dumps({"table": table, "ligne": ligne}, ensure_ascii=False) + "\n")
+        self.stats["deverses"] += len(lignes)
+
+    def _reecrire_en_cours(self, evenements):
+        en_cours = self.fichier_secours + ".en_cours"
+        if not evenements:
+            os.remove(en_cours)
+            return
+        with open(en_cours + ".tmp", "w", encoding="utf-8") as f:
+            for table, ligne in evenements:
+                f.write(json.dumps({"table": table, "ligne": ligne}, ensure_ascii=False) + "\n")
+        os.replace(en_cours + ".tmp", en_cours)
+
+    def _relire_secours(self):
+        # renommé avant lecture : ce qui échoue à nouveau sera re-déversé dans un fichier neuf ;
+        # un ".en_cours" resté d'un arrêt brutal est repris tel quel. Il n'est supprimé par
+        # vider() qu'une fois ses lignes écrites ou re-déversées.
+        en_cours = self.fichier_secours + ".en_cours"
+        if not os.path.exists(en_cours):
+            if not os.path.exists(self.fichier_secours):
+                return []
+            os.replace(self.fichier_secours, en_cours)
+        evenements, rejets = [], []
+        with open(en_cours, encoding="utf-8") as f:
+            for l in f:
+                if not l.strip():
+                    continue
+                try:
+                    e = json.loads(l)
+                    evenements.append((e["table"], e["ligne"]))
+                except (ValueError, KeyError, TypeError):
+                    rejets.append(l if l.endswith("\n") else l + "\n")
+        if rejets:
+            with open(self.fichier_secours + ".rejets", "a", encoding="utf-8") as f:
+                f.writelines(rejets)
+            self.stats["rejets"] += len(rejets)
+            journal.warning("%d ligne(s) illisible(s) mise(s) de côté dans %s.rejets", len(rejets), self.fichier_secours)
+        if not evenements:
+            os.remove(en_cours)
+        return evenements
+
+    # ==========================
+    # THREAD DE FOND
+    # ==========================
+    def demarrer(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._boucle, name="tampon-historique", daemon=True)
+        self._thread.start()
+        atexit.register(self.arreter)
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self._reveil.wait(self.intervalle)
+            self._reveil.clear()
+            if self._attente or os.path.exists(self.fichier_secours):
+                try:
+                    self.vider()
+                except Exception:
+                    # le thread doit survivre : on réessaiera au prochain réveil
+                    self.stats["erreurs_fond"] += 1
+                    journal.exception("échec du vidage du tampon d'historique")
+
+    def arreter(self):
+        self._arret.set()
+        self._reveil.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalle + 5)
+            self._thread = None
+        self.vider()
@@ -0,0 +1,67 @@
+import pytest
+
+from benchmarks.faux_supabase import FauxSupabase
+from stockage import SqliteStockage, SupabaseStockage
+
+DATE = "2026-01-01T10:00:00+00:00"
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def stockage(request, tmp_path):
+    # même contrat pour les deux moteurs : SQLite local et la fonction SQL (équivalent en mémoire)
+    if request.param == "sqlite":
+        s = SqliteStockage(str(tmp_path / "botanique.db"))
+    else:
+        s = SupabaseStockage(FauxSupabase())
+    s.enregistrer_joueur("alice", "joueur", "h")
+    return s
+
+
+def mouvement(plante, delta, **options):
+    return {"date": DATE, "pseudo": "alice", "plante": plante, "delta": delta, **options}
+
+
+def test_deltas_cumules(stockage):
+    stockage.appliquer_mouvements([mouvement("Menthe", 2)])
+    resultats = stockage.appliquer_mouvements([mouvement("Menthe", 3)])
+    assert resultats == [{"pseudo": "alice", "plante": "Menthe", "quantite": 5}]
+    assert stockage.inventaire("alice") == {"Menthe": 5}
+
+
+@pytest.mark.parametrize("delta", [-2, -5])
+def test_ligne_supprimee_a_zero_ou_moins(stockage, delta):
+    stockage.appliquer_mouvements([mouvement("Menthe", 2)])
+    resultats = stockage.appliquer_mouvements([mouvement("Menthe", delta)])
+    assert resultats == [{"pseudo": "alice", "plante": "Menthe", "quantite": 0}]
+    assert stockage.inventaire("alice") == {}
+    assert stockage.inventaires_joueurs()["alice"]["nb_plantes"] == 0
+
+
+def test_journal_usage(stockage):
+    stockage.appliquer_mouvements([mouvement("Menthe", 3)])
+    stockage.appliquer_mouvements([mouvement("Menthe", -1, effet="Soigne")])
+    journal = list(stockage.lignes("journal_usages"))
+    assert journal == [{"date": DATE, "pseudo": "alice", "plante": "Menthe", "quantite": 1, "effet": "Soigne"}]
+    assert list(stockage.lignes("historique_distributions")) == []
+
+
+def test_historique_distribution(stockage):
+    stockage.appliquer_mouvements([mouvement("Menthe", 4, distribution=True)])
+    distributions = list(stockage.lignes("historique_distributions"))
+    assert distributions == [{"date": DATE, "pseudo": "alice", "plante": "Menthe", "quantite": 4}]
+    assert list(stockage.lignes("journal_usages")) == []
+
+
+def test_lot_totaux_par_ligne(stockage):
+    stockage.appliquer_mouvements([mouvement("Sauge", 1)])
+    resultats = stockage.appliquer_mouvements([
+        mouvement("Menthe", 2),
+        mouvement("Sauge", 2),
+        mouvement("Menthe", 3),
+        mouvement("Sauge", -3),
+    ])
+    assert [r["quantite"] for r in resultats] == [2, 3, 5, 0]
+    assert [(r["pseudo"], r["plante"]) for r in resultats] == [
+        ("alice", "Menthe"), ("alice", "Sauge"), ("alice", "Menthe"), ("alice", "Sauge"),
+    ]
+    assert stockage.inventaire("alice") == {"Menthe": 5}
@@ -0,0 +1,195 @@
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# Bornes supérieures (ms) des classes de l'histogramme de latence
+BORNES_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+class Mesure:
+    __slots__ = ("appels", "total_ms", "max_ms", "lignes", "histogramme")
+
+    def __init__(self):
+        self.appels = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.lignes = 0
+        self.histogramme = [0] * len(BORNES_MS)
+
+    def ajouter(self, duree_ms, lignes=0):
+        self.appels += 1
+        self.total_ms += duree_ms
+        self.max_ms = max(self.max_ms, duree_ms)
+        self.lignes += lignes
+        self.histogramme[bisect_left(BORNES_MS, duree_ms)] += 1
+
+    def quantile(self, q):
+        # approximation par la borne de la classe qui contient le quantile
+        rang = q * self.appels
+        cumul = 0
+        for borne, n in zip(BORNES_MS, self.histogramme):
+            cumul += n
+            if cumul >= rang:
+                return borne
+        return BORNES_MS[-1]
+
+
+def compter_lignes(resultat):
+    if isinstance(resultat, tuple) and resultat and isinstance(resultat[0], (list, dict)):
+        resultat = resultat[0]  # (lignes, curseur) des lectures paginées
+    if isinstance(resultat, (list, dict)):
+        return len(resultat)
+    return 0
+
+
+# ==========================
+# TRACEUR
+# ==========================
+# Appels backend (instrumenter) et sections d'interface (span), agrégés pour tout le processus.
+# Désactivé, chaque point de mesure se réduit à un test de booléen.
+# Un rerun complet est mesuré par debut_rerun/fin_rerun ; un rerun limité à un fragment
+# (run_every, widget du fragment) n'exécute pas le module et l'est par span(nom, session).
+class Traceur:
+    def __init__(self, actif=True, journal=None, max_sessions=1000):
+        self.actif = actif
+        self.journal = journal  # fichier JSON lines : une ligne par rerun terminé
+        self.max_sessions = max_sessions
+        self._verrou = threading.Lock()
+        self.mesures = {}   # nom -> Mesure
+        # id de session -> {"reruns", "fragments", "total_ms", "dernier_ms"} ; LRU, les sessions
+        # inactives depuis le plus longtemps sont oubliées au-delà de max_sessions
+        self.sessions = OrderedDict()
+
+    def enregistrer(self, nom, duree_ms, lignes=0):
+        with self._verrou:
+            mesure = self.mesures.get(nom)
+            if mesure is None:
+                mesure = self.mesures[nom] = Mesure()
+            mesure.ajouter(duree_ms, lignes)
+
+    def instrumenter(self, fonction):
+        nom = f"backend.{fonction.__name__}"
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if not self.actif:
+                return fonction(*args, **kwargs)
+            debut = time.perf_counter()
+            resultat = fonction(*args, **kwargs)
+            self.enregistrer(nom, (time.perf_counter() - debut) * 1000, compter_lignes(resultat))
+            return resultat
+        return enveloppe
+
+    def span(self, nom, session=None):
+        # session : à passer quand le span couvre tout un rerun de fragment
+        if not self.actif:
+            return nullcontext()
+        return _Span(self, f"ui.{nom}", session)
+
+    def debut_rerun(self):
+        return time.perf_counter() if self.actif else None
+
+    def fin_rerun(self, session, debut):
+        if debut is None:
+            return
+        self.compter_rerun(session, (time.perf_counter() - debut) * 1000)
+
+    def compter_rerun(self, session, duree_ms, type_rerun="rerun"):
+        # type_rerun : "rerun" (script complet) ou "fragment"
+        self.enregistrer(type_rerun, duree_ms)
+        with self._verrou:
+            stats = self.sessions.get(session)
+            if stats is None:
+                stats = self.sessions[session] = {"reruns": 0, "fragments": 0, "total_ms": 0.0, "dernier_ms": 0.0}
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session)
+            stats["reruns" if type_rerun == "rerun" else "fragments"] += 1
+            stats["total_ms"] += duree_ms
+            stats["dernier_ms"] = duree_ms
+        if self.journal:
+            with open(self.journal, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": time.time(), "session": session, "type": type_rerun,
+                                    "rerun_ms": round(duree_ms, 3)}) + "\n")
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.mesures.clear()
+            self.sessions.clear()
+
+    # ==========================
+    # EXPORTS
+    # ==========================
+    def resume(self):
+        with self._verrou:
+            return [
+                {
+                    "Nom": nom,
+                    "Appels": m.appels,
+                    "Moyenne (ms)": round(m.total_ms / m.appels, 2),
+                    "p50 ≤ (ms)": m.quantile(0.5),
+                    "p99 ≤ (ms)": m.quantile(0.99),
+                    "Max (ms)": round(m.max_ms, 2),
+                    "Lignes": m.lignes,
+                }
+                for nom, m in sorted(self.mesures.items())
+            ]
+
+    def exporter_json(self):
+        with self._verrou:
+            return json.dumps({
+                "mesures": {
+                    nom: {
+                        "appels": m.appels, "total_ms": round(m.total_ms, 3), "max_ms": round(m.max_ms, 3),
+                        "lignes": m.lignes,
+                        "histogramme": {str(b): n for b, n in zip(BORNES_MS, m.histogramme)},
+                    }
+                    for nom, m in self.mesures.items()
+                },
+                "sessions": dict(self.sessions),
+            }, indent=2)
+
+    def exporter_prometheus(self):
+        lignes = [
+            "# HELP botanique_duree_ms Durée des appels backend, sections d'interface et reruns.",
+            "# TYPE botanique_duree_ms histogram",
+        ]
+        with self._verrou:
+            for nom, m in sorted(self.mesures.items()):
+                cumul = 0
+                for borne, n in zip(BORNES_MS, m.histogramme):
+                    cumul += n
+                    le = "+Inf" if borne == float("inf") else str(borne)
+                    lignes.append(f'botanique_duree_ms_bucket{{nom="{nom}",le="{le}"}} {cumul}')
+                lignes.append(f'botanique_duree_ms_sum{{nom="{nom}"}} {m.total_ms:.3f}')
+                lignes.append(f'botanique_duree_ms_count{{nom="{nom}"}} {m.appels}')
+            lignes.append("# TYPE botanique_lignes_total counter")
+            for nom, m in sorted(self.mesures.items()):
+                if m.lignes:
+                    lignes.append(f'botanique_lignes_total{{nom="{nom}"}} {m.lignes}')
+        return "\n".join(lignes) + "\n"
+
+
+class _Span:
+    __slots__ = ("traceur", "nom", "session", "debut")
+
+    def __init__(self, traceur, nom, session=None):
+        self.traceur = traceur
+        self.nom = nom
+        self.session = session
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree_ms = (time.perf_counter() - self.debut) * 1000
+        self.traceur.enregistrer(self.nom, duree_ms)
+        if self.session is not None:
+            self.traceur.compter_rerun(self.session, duree_ms, "fragment")
+        return False